@@ -1,28 +1,62 @@
 # ================================================================
 #  app.py  –  Social‑Media Analysis backend (Flask + MySQL)
 # ================================================================
-from flask import Flask, request, jsonify
-import mysql.connector, json, re
+from flask import Flask, request, jsonify, stream_with_context, g
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+import mysql.connector, json, re, base64, hashlib
 from contextlib import contextmanager
-from datetime import datetime
+from functools import wraps
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from db_pool import ConnectionPool, PoolTimeout
+from bulk_import import import_posts, parse_ndjson
+import project_stats, data_version, dim_cache, reposts, export
+from response_cache import ResponseCache, request_key
+from jobs import JobQueue, UnknownJobKind, STATES
+from query_filters import (PostFilter, FilterError, FILTER_KEYS, search_sql, assign_sql,
+                           combo_posts_sql, combo_stream_sql, fetch_prepared)
 
 app = Flask(__name__)
 
 # ---------------------------------------------------------------
-#  DB connection helper  (simple for coursework; prod → pool)
+#  DB connection helper  (pooled, see db_pool.py)
 # ---------------------------------------------------------------
 with open("db_config.json") as f:
     DB_CFG = json.load(f)
+POOL_CFG = DB_CFG.pop("pool", {})
+CACHE_CFG = DB_CFG.pop("cache", {})
+JOBS_CFG = DB_CFG.pop("jobs", {})
+
+POOL = ConnectionPool(DB_CFG, **POOL_CFG)
+CACHE = ResponseCache.from_config(CACHE_CFG,
+                                  versions=lambda deps: current_versions(deps),
+                                  variant=lambda: representation())
+JOBS = JobQueue(POOL, dumps=app.json.dumps, **JOBS_CFG)   # results as the routes send them
 
 @contextmanager
-def db_cursor():
-    conn = mysql.connector.connect(**DB_CFG)
-    cur = conn.cursor(dictionary=True,buffered=True)
+def db_cursor(unlimited=False, **cursor_kw):
+    """
+    (conn, cur) from the pool.  unlimited=True lifts the pool's
+    statement_timeout for streams and jobs that run long by design.
+    """
+    conn = POOL.acquire()
+    if unlimited:
+        try:
+            POOL.lift_timeout(conn)
+        except Exception:
+            POOL.release(conn, discard=True)
+            raise
+    cur = conn.cursor(**{"dictionary": True, "buffered": True, **cursor_kw})
+    broken = False
     try:
         yield conn, cur
     except mysql.connector.Error as e:
-        # Optional: rollback on errors if needed
-        conn.rollback()
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            broken = True
         raise e
     finally:
         try:
@@ -35,7 +69,99 @@ def db_cursor():
             cur.close()
         except mysql.connector.errors.InternalError:
             pass
-        conn.close()
+        dim_cache.DIMS.rolled_back(conn)     # ids from an uncommitted transaction
+        POOL.release(conn, discard=broken)
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(e):
+    return bad("Database busy, try again", 503)
+
+@app.errorhandler(dim_cache.DimensionError)
+def dimension_error(e):
+    return bad(str(e))
+
+@app.errorhandler(mysql.connector.Error)
+def db_error(e):
+    if e.errno == 3024:         # ER_QUERY_TIMEOUT: pool statement_timeout hit
+        return bad("Query took too long", 504)
+    if e.errno == 1064 and has_content_filter():
+        # ER_PARSE_ERROR from InnoDB's boolean‑mode parser, e.g. "*foo" or "+"
+        return bad("content is not a valid full‑text search expression")
+    raise e
+
+def has_content_filter():
+    if request.args.get("content"):
+        return True
+    body = request.get_json(silent=True)
+    return isinstance(body, dict) and isinstance(body.get("filter"), dict) \
+        and bool(body["filter"].get("content"))
+
+@app.route("/pool_stats", methods=["GET"])
+def pool_stats():
+    return jsonify(POOL.stats())
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify({**CACHE.stats(), "dimensions": dim_cache.DIMS.stats()})
+
+# Cache tags – a write bumps every tag whose cached reads it can change:
+#   "projects"      project list         "project:<id>"  one project's data
+#   "project:*"     reads not keyed by a single project id
+#   "posts", "users"
+def project_tags(pid):
+    return ("project:*",) if pid is None else (f"project:{pid}", "project:*")
+
+def analysis_tags(args):
+    pid = args.get("project_id")
+    return [f"project:{pid}"] if pid and pid.isdigit() else ["project:*"]
+
+def commit_with_tags(conn, cur, *tags):
+    """Commit the write, publish new dimension ids, then bump the tags'
+    DataVersion counters, which retires cached reads of those tags."""
+    conn.commit()
+    dim_cache.DIMS.committed(conn)
+    data_version.bump_committed(conn, cur, *tags)
+
+def current_versions(deps):
+    """DataVersion counters of *deps*, reusing what conditional() read."""
+    seen = g.get("data_versions")
+    if seen is not None and seen[0] == deps:
+        return seen[1]
+    with db_cursor() as (conn, cur):
+        return data_version.read(cur, deps)
+
+def etag_for(endpoint, arg_items, deps, versions, variant):
+    key = request_key(endpoint, arg_items, deps, versions, variant)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def conditional(tags):
+    """
+    Strong ETag for a GET view from the DataVersion counters of *tags*
+    (list, or callable(request.args) like CACHE.cached).  A matching
+    If-None-Match costs one primary‑key lookup and returns 304.
+    """
+    def deco(view):
+        @wraps(view)
+        def wrapper(*a, **kw):
+            deps = tags(request.args) if callable(tags) else list(tags)
+            with db_cursor() as (conn, cur):
+                versions = data_version.read(cur, deps)
+            g.data_versions = (deps, versions)      # CACHE.cached keys on these
+            etag = etag_for(request.endpoint, request.args.items(multi=True),
+                            deps, versions, representation())
+
+            if etag in request.if_none_match:
+                resp = app.response_class(status=304)
+            else:
+                resp = app.make_response(view(*a, **kw))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag)
+            resp.vary.add("Accept")             # JSON or NDJSON, see wants_stream()
+            return resp
+        return wrapper
+    return deco
+
 # ---------------------------------------------------------------
 #  Small utilities
 # ---------------------------------------------------------------
@@ -51,41 +177,106 @@ def valid_datetime(s):
     except ValueError:
         return False
 
+def parse_datetime(s):
+    """A validated YYYY-MM-DD[ HH:MM:SS] string as a datetime."""
+    s = s.strip()
+    return datetime.strptime(s, "%Y-%m-%d %H:%M:%S" if " " in s else "%Y-%m-%d")
+
+def parse_range(start, end):
+    """
+    Turn validated start/end strings into a half‑open [lo, hi) datetime
+    window.  A bare date covers the whole day; a full timestamp is
+    inclusive to the second.
+    """
+    start, end = start.strip(), end.strip()
+    lo = datetime.strptime(start, "%Y-%m-%d %H:%M:%S" if " " in start else "%Y-%m-%d")
+    if " " in end:
+        hi = datetime.strptime(end, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=1)
+    else:
+        hi = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+    return lo, hi
+
 def bad(msg, code=400):
     return jsonify({"error": msg}), code
 
-def field_pct(cur, pid: int, post_ids=None):
-    if post_ids:
-        in_clause, in_vals = sql_in(post_ids)
-        cur.execute(
-            f"SELECT COUNT(*) AS tot FROM ProjectPost "
-            f"WHERE project_id=%s AND post_id IN {in_clause}",
-            (pid, *in_vals),
-        )
-    else:
-        cur.execute(
-            "SELECT COUNT(*) AS tot FROM ProjectPost WHERE project_id=%s", (pid,)
-        )
-    total = cur.fetchone()["tot"] or 1
-
-    subset_sql, subset_vals = sql_in(post_ids) if post_ids else ("", ())
-    subset_filter = f"AND pp.post_id IN {subset_sql}" if post_ids else ""
-
-    cur.execute(
-        f"""
-        SELECT f.name, COUNT(ar.id) AS filled
-        FROM   ProjectField f
-        LEFT   JOIN AnalysisResult ar ON ar.field_id = f.id
-        LEFT   JOIN ProjectPost pp ON pp.id = ar.project_post_id
-                                   AND pp.project_id = %s {subset_filter}
-        GROUP  BY f.id
-        """,
-        (pid, *subset_vals),
+def int_field(d, key):
+    """d[key] as an int (JSON number or digit string); ValueError otherwise."""
+    v = d.get(key)
+    if isinstance(v, bool) or not (isinstance(v, int)
+                                   or isinstance(v, str) and v.strip().isdigit()):
+        raise ValueError(f"{key} must be an integer")
+    return int(v)
+
+def row_exists(cur, table, id_):
+    cur.execute(f"SELECT id FROM {table} WHERE id=%s", (id_,))
+    return cur.fetchone() is not None
+
+def field_completion(cur, project_ids, post_ids=None):
+    """
+    Per‑project, per‑field fill counts computed with GROUP BY in MySQL –
+    two statements however many projects are asked for.  *post_ids*
+    restricts both the post totals and the fills to that subset.
+
+    Returns {project_id: {"total_posts": n,
+                          "fields": {name: {"filled": k, "pct": 12.5}}}}
+    with every field of every requested project present (0 when unfilled).
+    """
+    if not project_ids:
+        return {}
+    totals_q, fields_q = field_completion_queries(project_ids, post_ids)
+    cur.execute(*totals_q)
+    totals = cur.fetchall()
+    cur.execute(*fields_q)
+    return field_completion_result(project_ids, totals, cur.fetchall())
+
+# The statement halves of field_completion(), shared with asgi_app.py
+def field_completion_queries(project_ids, post_ids=None):
+    """(totals, fields) – two (sql, params) pairs."""
+    proj_sql, proj_vals = sql_in(project_ids)
+    sub_sql, sub_vals = sql_in(post_ids) if post_ids else ("", ())
+    subset = f"AND pp.post_id IN {sub_sql}" if post_ids else ""
+    return (
+        (
+            f"""
+            SELECT pp.project_id, COUNT(*) AS total
+            FROM   ProjectPost pp
+            WHERE  pp.project_id IN {proj_sql} {subset}
+            GROUP  BY pp.project_id
+            """,
+            (*proj_vals, *sub_vals),
+        ),
+        (
+            f"""
+            SELECT f.project_id, f.name, COUNT(pp.id) AS filled
+            FROM   ProjectField f
+            LEFT   JOIN (AnalysisResult ar
+                         JOIN ProjectPost pp ON pp.id = ar.project_post_id {subset})
+                   ON ar.field_id = f.id
+            WHERE  f.project_id IN {proj_sql}
+            GROUP  BY f.project_id, f.id, f.name
+            """,
+            (*sub_vals, *proj_vals),
+        ),
     )
-    return {
-        row["name"]: f"{round(row['filled'] / total * 100, 2):.2f}%"
-        for row in cur.fetchall()
+
+def field_completion_result(project_ids, total_rows, field_rows):
+    totals = {r["project_id"]: r["total"] for r in total_rows}
+    out = {
+        pid: {"total_posts": totals.get(pid, 0), "fields": {}}
+        for pid in project_ids
     }
+    for r in field_rows:
+        entry = out[r["project_id"]]
+        total = entry["total_posts"]
+        entry["fields"][r["name"]] = {
+            "filled": r["filled"],
+            "pct": round(r["filled"] / total * 100, 2) if total else 0.0,
+        }
+    return out
+
+def completion_pcts(entry):
+    """{field: pct} view of one field_completion() entry."""
+    return {name: f["pct"] for name, f in entry["fields"].items()}
 
 def sql_in(ids):
     """Return ('%s,%s,...', tuple(ids)) for a parameterized IN clause."""
@@ -94,6 +285,139 @@ def sql_in(ids):
     placeholders = ",".join(["%s"] * len(ids))
     return f"({placeholders})", tuple(ids)
 
+BULK_CHUNK = 1000       # rows per multi‑row INSERT / IN (...) list
+
+def chunks(seq, n=BULK_CHUNK):
+    seq = list(seq)
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def sql_values(rows):
+    """Return ('(%s,%s),(%s,%s)...', flat_params) for a multi‑row VALUES list."""
+    width = len(rows[0])
+    group = "(" + ",".join(["%s"] * width) + ")"
+    return ",".join([group] * len(rows)), tuple(v for r in rows for v in r)
+
+# ---------------------------------------------------------------
+#  NDJSON streaming  (opt‑in: ?stream=1 or Accept: application/x-ndjson)
+# ---------------------------------------------------------------
+STREAM_BATCH = 500      # rows pulled from the server per fetchmany()
+
+def negotiate_stream(stream_arg, accept):
+    """
+    True if ?stream= is set or the Accept header value *accept* ranks
+    NDJSON above JSON (q‑values and all entries count, as in Flask's
+    best_match).  Shared with asgi_app.py.
+    """
+    if (stream_arg or "").lower() in ("1", "true", "yes"):
+        return True
+    best = parse_accept_header(accept, MIMEAccept).best_match(
+        ["application/json", "application/x-ndjson"]
+    )
+    return best == "application/x-ndjson"
+
+def wants_stream():
+    return negotiate_stream(request.args.get("stream"), request.headers.get("Accept"))
+
+def representation():
+    return "ndjson" if wants_stream() else "json"
+
+def ndjson_response(query, params, emit):
+    """
+    Run *query* on an unbuffered cursor and stream one JSON line per item
+    yielded by emit(rows_iterator).  Rows are pulled STREAM_BATCH at a time,
+    so the worker never holds the whole result set.  The query runs
+    before the response starts, so its errors still get a status code.
+    """
+    def rows(cur):
+        while True:
+            batch = cur.fetchmany(STREAM_BATCH)
+            if not batch:
+                return
+            yield from batch
+
+    def generate():
+        with db_cursor(unlimited=True, buffered=False) as (_, cur):
+            cur.execute(query, params)
+            yield ""
+            for item in emit(rows(cur)):
+                yield json.dumps(item, default=str) + "\n"
+
+    body = generate()
+    next(body)                      # execute now, inside the request
+    return app.response_class(
+        stream_with_context(body), mimetype="application/x-ndjson"
+    )
+
+def fmt_time(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+# ---------------------------------------------------------------
+#  Keyset pagination  (opt‑in: ?limit=N and/or ?cursor=<token>)
+# ---------------------------------------------------------------
+DEFAULT_PAGE = 100
+MAX_PAGE     = 1000
+
+def encode_cursor(*key):
+    raw = json.dumps(key, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token):
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    key = json.loads(raw)
+    if not isinstance(key, list):
+        raise ValueError("bad cursor")
+    return key
+
+def page_args(kind="time", args=None):
+    """
+    Return (limit, after) for a paged request, or (None, None) when the
+    caller asked for no paging.  *after* is the last key of the previous
+    page: (post_time, id) for kind="time", a string for kind="name",
+    (Decimal score, id) for kind="score".
+    *args* defaults to the Flask request's query string.
+    Raises ValueError on a malformed limit/cursor.
+    """
+    args = request.args if args is None else args
+    lim, tok = args.get("limit"), args.get("cursor")
+    if lim is None and tok is None:
+        return None, None
+    try:
+        limit = max(1, min(int(lim), MAX_PAGE)) if lim else DEFAULT_PAGE
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer") from None
+    if not tok:
+        return limit, None
+    try:
+        key = decode_cursor(tok)
+        if kind == "name":
+            (after,) = key
+            return limit, str(after)
+        if kind == "score":
+            score, i = key
+            score = Decimal(str(score))
+            if not score.is_finite():
+                raise ValueError("bad cursor")
+            return limit, (score, int(i))
+        t, i = key
+        return limit, (datetime.strptime(t, "%Y-%m-%d %H:%M:%S"), int(i))
+    except (TypeError, ValueError, UnicodeDecodeError, InvalidOperation):
+        raise ValueError("Invalid cursor")
+
+def keyset(time_col, id_col, after, desc=False):
+    """WHERE fragment resuming strictly after (post_time, id) *after*."""
+    if not after:
+        return "", ()
+    op = "<" if desc else ">"
+    t, i = after
+    return (
+        f" AND ({time_col} {op} %s OR ({time_col} = %s AND {id_col} {op} %s))",
+        (t, t, i),
+    )
+
+def time_cursor(row):
+    return encode_cursor(fmt_time(row["post_time"]), row["id"])
+
 # ===============================================================
 #  1.  DATA‑ENTRY ROUTES
 # ===============================================================
@@ -134,13 +458,7 @@ def add_project():
 
     with db_cursor() as (conn, cur):
     # ----- 2. institute  (get or create) ----------------------------
-        cur.execute("SELECT id FROM Institute WHERE name=%s", (d["institute"],))
-        row = cur.fetchone()
-        if not row:
-            cur.execute("INSERT INTO Institute (name) VALUES (%s)", (d["institute"],))
-            institute_id = cur.lastrowid
-        else:
-            institute_id = row[0]
+        institute_id = dim_cache.institute_id(conn, cur, d["institute"])
 
         # ----- 3. create project  (catch duplicate‑name / bad‑date) -----
         try:
@@ -173,24 +491,17 @@ def add_project():
         project_id = cur.lastrowid
 
         # ----- 4. optionally link supplied posts -----------------------
-        if post_ids:
-            placeholders = ",".join(["%s"] * len(post_ids))
-            cur.execute(
-                f"SELECT id FROM Post WHERE id IN ({placeholders})", tuple(post_ids)
-            )
-            valid_ids = [r["id"] for r in cur.fetchall()]
-            for pid in valid_ids:
-                cur.execute(
-                    "INSERT IGNORE INTO ProjectPost (project_id, post_id) VALUES (%s,%s)",
-                    (project_id, pid),
-                )
+        _, linked = link_posts(cur, project_id, post_ids)
+        project_stats.add_posts(cur, project_id, linked)
 
-        conn.commit()
+        commit_with_tags(conn, cur, "projects", *project_tags(project_id))
 
     return jsonify({"status": "Project added", "project_id": project_id}), 201
 
 
 @app.route("/list_projects", methods=["GET"])
+@conditional(["projects"])
+@CACHE.cached(["projects"])
 def list_projects():
     """Return all projects as a list of {id, name}"""
     with db_cursor() as (conn, cur):
@@ -198,44 +509,107 @@ def list_projects():
         projects = cur.fetchall()
     return jsonify({"projects": projects})
 
+def posts_in_range_query(lo, hi, platform=None, after=None, limit=None):
+    """
+    SQL for /get_posts_in_range.  The window is a bare half‑open range on
+    Post.post_time (idx_post_time); with a platform it becomes an equality
+    on social_media_id plus that range, which idx_social_time serves.
+    """
+    ks_sql, ks_vals = keyset("Post.post_time", "Post.id", after)
+    query = f"""
+            SELECT 
+                Post.id, Post.post_time, `User`.username, SocialMedia.name AS social_media
+            FROM Post
+            JOIN `User` ON Post.user_id = `User`.id
+            JOIN SocialMedia ON Post.social_media_id = SocialMedia.id
+            WHERE Post.post_time >= %s AND Post.post_time < %s
+            {"AND SocialMedia.name = %s" if platform else ""} {ks_sql}
+            ORDER BY Post.post_time, Post.id
+            {"LIMIT %s" if limit else ""}
+        """
+    params = (lo, hi, *((platform,) if platform else ()), *ks_vals,
+              *((limit + 1,) if limit else ()))
+    return query, params
+
+def range_post_row(row):
+    return {
+        "id": row["id"],
+        "post_time": fmt_time(row["post_time"]),
+        "username": row["username"],
+        "social_media": row["social_media"]
+    }
+
 @app.route("/get_posts_in_range")
+@conditional(["posts", "users"])
 def get_posts_in_range():
     start = request.args.get("start")
     end = request.args.get("end")
+    platform = request.args.get("social_media", "").strip() or None
 
-    if not valid_datetime(start) or not valid_datetime(end):
+    if not start or not end or not valid_datetime(start) or not valid_datetime(end):
         return jsonify({"posts": []}), 400
+    lo, hi = parse_range(start, end)
 
-    with db_cursor() as (conn, cur):
-        cur.execute("""
-            SELECT 
-                Post.id, Post.post_time, `User`.username, SocialMedia.name AS social_media
-            FROM Post
-            JOIN `User` ON Post.user_id = `User`.id
-            JOIN SocialMedia ON Post.social_media_id = SocialMedia.id
-            WHERE DATE(Post.post_time) BETWEEN %s AND %s
-            ORDER BY Post.post_time
-        """, (start, end))
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return bad(str(e))
+    if wants_stream():
+        limit = after = None        # a stream always covers the full range
 
-        posts = [
-            {
-                "id": row["id"],
-                "post_time": row["post_time"].strftime("%Y-%m-%d %H:%M:%S"),
-                "username": row["username"],
-                "social_media": row["social_media"]
-            }
-            for row in cur.fetchall()
-        ]
+    query, params = posts_in_range_query(lo, hi, platform, after, limit)
+
+    if wants_stream():
+        return ndjson_response(query, params, lambda rows: map(range_post_row, rows))
+
+    with db_cursor() as (conn, cur):
+        cur.execute(query, params)
+        rows = cur.fetchall()
 
-    return jsonify({"posts": posts})
+    if not limit:
+        return jsonify({"posts": [range_post_row(row) for row in rows]})
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        "posts": [range_post_row(row) for row in rows],
+        "next_cursor": time_cursor(rows[-1]) if more else None,
+    })
 
 @app.route("/list_usernames")
+@conditional(["users"])
+@CACHE.cached(["users"])
 def list_usernames():
+    try:
+        limit, after = page_args(kind="name")
+    except ValueError as e:
+        return bad(str(e))
+
     with db_cursor() as (conn, cur):
-        cur.execute("SELECT DISTINCT username FROM `User`")
-        return jsonify({"usernames": [r['username'] for r in cur.fetchall()]})
+        if not limit:
+            cur.execute("SELECT DISTINCT username FROM `User`")
+            return jsonify({"usernames": [r['username'] for r in cur.fetchall()]})
+
+        cur.execute(
+            f"""
+            SELECT DISTINCT username FROM `User`
+            {"WHERE username > %s" if after is not None else ""}
+            ORDER BY username
+            LIMIT %s
+            """,
+            (*((after,) if after is not None else ()), limit + 1),
+        )
+        names = [r['username'] for r in cur.fetchall()]
+
+    more = len(names) > limit
+    names = names[:limit]
+    return jsonify({
+        "usernames": names,
+        "next_cursor": encode_cursor(names[-1]) if more else None,
+    })
 
 @app.route("/list_user_platforms")
+@conditional(["users", "posts"])
+@CACHE.cached(["users", "posts"])
 def list_user_platforms():
     username = request.args.get("username")
     with db_cursor() as (conn, cur):
@@ -249,60 +623,175 @@ def list_user_platforms():
         return jsonify({"platforms": [r['name'] for r in cur.fetchall()]})
 
 @app.route("/list_user_posts")
+@conditional(["posts", "users"])
 def list_user_posts():
     username = request.args.get("username")
     platform = request.args.get("platform")
 
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return bad(str(e))
+    kind = request.args.get("type")
+    if kind not in (None, "original", "repost"):
+        return bad("type must be original or repost")
+
     with db_cursor() as (conn, cur):
-        cur.execute("""
-            (
-                SELECT 
-                    p.id AS id,
-                    p.post_time AS post_time,
-                    p.content AS content,
-                    'original' AS post_type,
-                    NULL AS original_post_id,
-                    u.username AS username
-                FROM Post p
-                JOIN `User` u ON p.user_id = u.id
-                JOIN SocialMedia s ON p.social_media_id = s.id
-                WHERE u.username = %s AND s.name = %s
-                  AND NOT EXISTS (
-                      SELECT 1 FROM Repost r WHERE r.repost_post_id = p.id
-                  )
-            )
-            UNION ALL
-            (
-                SELECT 
-                    p.id AS id,
-                    p.post_time AS post_time,
-                    p.content AS content,
-                    'repost' AS post_type,
-                    r.original_post_id AS original_post_id,
-                    u.username AS username
-                FROM Post p
-                JOIN Repost r ON p.id = r.repost_post_id
-                JOIN `User` u ON p.user_id = u.id
-                JOIN SocialMedia s ON p.social_media_id = s.id
-                WHERE u.username = %s AND s.name = %s
-            )
-            ORDER BY post_time
-        """, (username, platform, username, platform))
+        cur.execute(*user_posts_query(username, platform, kind, after, limit))
+        rows = cur.fetchall()
+    return jsonify(user_posts_body(rows, limit))
+
+# The request‑independent halves of /list_user_posts, shared with asgi_app.py
+def user_posts_query(username, platform, kind=None, after=None, limit=None):
+    # Post.is_repost tells originals from reposts; the Repost row is only
+    # looked up (idx_repost_post) for the original_post_id of a repost.
+    ks_sql, ks_vals = keyset("p.post_time", "p.id", after)
+    return f"""
+        SELECT
+            p.id AS id,
+            p.post_time AS post_time,
+            p.content AS content,
+            IF(p.is_repost, 'repost', 'original') AS post_type,
+            r.original_post_id AS original_post_id,
+            p.repost_count AS repost_count,
+            u.username AS username
+        FROM Post p
+        JOIN `User` u ON p.user_id = u.id
+        JOIN SocialMedia s ON p.social_media_id = s.id
+        LEFT JOIN Repost r ON p.is_repost AND r.repost_post_id = p.id
+        WHERE u.username = %s AND s.name = %s
+          {"AND p.is_repost = %s" if kind else ""} {ks_sql}
+        ORDER BY p.post_time, p.id
+        {"LIMIT %s" if limit else ""}
+    """, (username, platform, *((kind == "repost",) if kind else ()),
+          *ks_vals, *((limit + 1,) if limit else ()))
+
+def user_posts_body(rows, limit):
+    more = bool(limit) and len(rows) > limit
+    rows = rows[:limit] if limit else rows
+    posts = [
+        {
+            "id": r["id"],
+            "post_time": fmt_time(r["post_time"]),
+            "content": r["content"],
+            "type": r["post_type"],
+            "original_post_id": r["original_post_id"],
+            "repost_count": r["repost_count"],
+            "username": r["username"]
+        }
+        for r in rows
+    ]
+
+    if not limit:
+        return {"posts": posts}
+    return {
+        "posts": posts,
+        "next_cursor": time_cursor(rows[-1]) if more else None,
+    }
 
-        posts = [
-            {
-                "id": r["id"],
-                "post_time": r["post_time"].strftime("%Y-%m-%d %H:%M:%S"),
-                "content": r["content"],
-                "type": r["post_type"],
-                "original_post_id": r["original_post_id"],
-                "username": r["username"]
-            }
-            for r in cur.fetchall()
-        ]
 
-    return jsonify({"posts": posts})
 
+# ---------------------------------------------------------------
+#  Repost cascades  (SQL in reposts.py)
+# ---------------------------------------------------------------
+def cascade_args(args=None):
+    """(post_id, max_depth) from the query string; ValueError if malformed."""
+    args = request.args if args is None else args
+    post_id = int(args.get("post_id", ""))
+    depth = int(args.get("max_depth", reposts.MAX_DEPTH))
+    return post_id, max(1, min(depth, reposts.MAX_DEPTH))
+
+def cascade_body(root, edges):
+    """/repost_cascade payload for *root* and its cascade_query() *edges*."""
+    tree, metrics = reposts.build_tree(root, edges)
+    root = {**root, "post_time": fmt_time(root["post_time"])}
+    if metrics["depth"] > reposts.TREE_MAX_DEPTH:
+        return {"root": root, "metrics": metrics, "tree": None,
+                "edges": [reposts.edge_row(e) for e in edges]}
+    return {"root": root, "metrics": metrics, "tree": tree}
+
+@app.route("/repost_cascade", methods=["GET"])
+@conditional(["posts"])
+@CACHE.cached(["posts"])
+def repost_cascade():
+    """
+    Full repost tree under post_id:
+      {"root": {...}, "metrics": {...}, "tree": {"post_id", "username",
+       "reposts": [{"post_id", "username", "repost_time", "reposts": [...]}]}}
+    Optional max_depth.  With ?stream=1 the edges are streamed as NDJSON
+    (parent_id, post_id, username, repost_time, depth), level by level.
+    A cascade deeper than reposts.TREE_MAX_DEPTH comes back with
+    "tree": null and those edges as a flat "edges" list instead.
+    """
+    try:
+        post_id, max_depth = cascade_args()
+    except ValueError:
+        return bad("post_id and max_depth must be integers")
+
+    query, params = reposts.cascade_query(post_id, max_depth)
+    if wants_stream():
+        return ndjson_response(query, params, lambda rows: map(reposts.edge_row, rows))
+
+    with db_cursor() as (conn, cur):
+        root = reposts.root_post(cur, post_id)
+        if not root:
+            return bad("Post not found", 404)
+        cur.execute(query, params)
+        edges = cur.fetchall()
+    return jsonify(cascade_body(root, edges))
+
+@app.route("/repost_cascade_metrics", methods=["GET"])
+@conditional(["posts"])
+@CACHE.cached(["posts"])
+def repost_cascade_metrics():
+    """Size, depth, max breadth and velocity of post_id's cascade, no tree."""
+    try:
+        post_id, max_depth = cascade_args()
+    except ValueError:
+        return bad("post_id and max_depth must be integers")
+
+    with db_cursor() as (conn, cur):
+        root = reposts.root_post(cur, post_id)
+        if not root:
+            return bad("Post not found", 404)
+        metrics = reposts.cascade_metrics(cur, root, max_depth)
+    return jsonify({"post_id": post_id, "metrics": metrics})
+
+@app.route("/top_reposted", methods=["GET"])
+@conditional(["posts"])
+@CACHE.cached(["posts"])
+def top_reposted():
+    """
+    The N posts reposted most often within [start, end]:
+      /top_reposted?start=2025-01-01&end=2025-01-31[&limit=10][&social_media=X]
+    window=repost (default) counts reposts made in the window;
+    window=post ranks originals posted in the window by total reposts.
+    """
+    try:
+        query = reposts.top_reposted_query(*top_reposted_args(request.args))
+    except ValueError as e:
+        return bad(str(e))
+
+    with db_cursor() as (conn, cur):
+        cur.execute(*query)
+        rows = cur.fetchall()
+    return jsonify({"posts": [{**r, "post_time": fmt_time(r["post_time"])} for r in rows]})
+
+def top_reposted_args(args):
+    """(lo, hi, limit, platform, window) for top_reposted_query(); ValueError."""
+    start, end = args.get("start"), args.get("end")
+    if not start or not end or not valid_datetime(start) or not valid_datetime(end):
+        raise ValueError("start and end must be YYYY‑MM‑DD[ HH:MM:SS]")
+    lo, hi = parse_range(start, end)
+    try:
+        limit = max(1, min(int(args.get("limit", 10)), MAX_PAGE))
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    platform = args.get("social_media", "").strip() or None
+    window = args.get("window", "repost")
+    if window not in ("repost", "post"):
+        raise ValueError("window must be repost or post")
+    return lo, hi, limit, platform, window
 
 
 @app.route("/add_post", methods=["POST"])
@@ -315,152 +804,373 @@ def add_post():
         return bad("post_time must be YYYY‑MM‑DD HH:MM:SS")
 
     with db_cursor() as (conn, cur):
-        # social‑media (get or create)
-        cur.execute("SELECT id FROM SocialMedia WHERE name=%s", (d["social_media"],))
-        row = cur.fetchone()
-        if not row:
-            cur.execute("INSERT INTO SocialMedia (name) VALUES (%s)", (d["social_media"],))
-            media_id = cur.lastrowid
-        else:
-            media_id = row["id"]
+        # social‑media and user (cached get or create, see dim_cache.py)
+        media_id = dim_cache.platform_id(conn, cur, d["social_media"])
+        user_id = dim_cache.user_id(conn, cur, d["username"], media_id, d)
 
-        # user (get or create)
-        cur.execute(
-            "SELECT id FROM `User` WHERE username=%s AND social_media_id=%s",
-            (d["username"], media_id),
-        )
-        row = cur.fetchone()
-        if not row:
+        # insert post – UNIQUE(user_id, social_media_id, post_time) is the
+        # duplicate check
+        try:
             cur.execute(
                 """
-                INSERT INTO `User`
-                  (username, social_media_id, first_name, last_name,
-                   country_of_birth, country_of_residence, age, gender, verified)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                INSERT INTO Post
+                  (user_id, social_media_id, post_time, content, city, state, country,
+                   likes, dislikes, multimedia, media_url)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
                 """,
                 (
-                    d["username"],
+                    user_id,
                     media_id,
-                    d.get("first_name"),
-                    d.get("last_name"),
-                    d.get("birth_country"),
-                    d.get("residence_country"),
-                    d.get("age"),
-                    d.get("gender"),
-                    d.get("verified", False),
+                    d["post_time"],
+                    d["content"],
+                    d.get("city"),
+                    d.get("state"),
+                    d.get("country"),
+                    int(d.get("likes", 0)),
+                    int(d.get("dislikes", 0)),
+                    bool(d.get("multimedia", False)),
+                    d.get("media_url"),
                 ),
             )
-            user_id = cur.lastrowid
-        else:
-            user_id = row["id"]
-
-        # duplicate check
-        cur.execute(
-            """
-            SELECT 1 FROM Post
-            WHERE user_id=%s AND social_media_id=%s AND post_time=%s
-            """,
-            (user_id, media_id, d["post_time"]),
-        )
-        if cur.fetchone():
+        except mysql.connector.IntegrityError as e:
+            if e.errno != 1062:
+                raise
             return jsonify({"status": "Post already exists"}), 200
-
-        # insert post
-        cur.execute(
-            """
-            INSERT INTO Post
-              (user_id, social_media_id, post_time, content, city, state, country,
-               likes, dislikes, multimedia, media_url)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """,
-            (
-                user_id,
-                media_id,
-                d["post_time"],
-                d["content"],
-                d.get("city"),
-                d.get("state"),
-                d.get("country"),
-                int(d.get("likes", 0)),
-                int(d.get("dislikes", 0)),
-                bool(d.get("multimedia", False)),
-                d.get("media_url"),
-            ),
-        )
-        conn.commit()
+        commit_with_tags(conn, cur, "posts", "users")
     return jsonify({"status": "Post added"}), 201
 
-@app.route("/repost", methods=["POST"])
-def repost():
-    data = request.json
-    original_post_id = data.get("original_post_id")
-    reposter_username = data.get("reposter_username")
-    repost_time = data.get("repost_time")
+@app.route("/import_posts", methods=["POST"])
+def import_posts_route():
+    """
+    Bulk /add_post.  Body is either NDJSON (one post object per line,
+    Content-Type: application/x-ndjson) or JSON {"posts": [...]}.
+    Optional ?chunk_size=N (default 5000) sets rows per commit.
+    Errors are reported per record: "ref" is the NDJSON line number or
+    the list index.  With ?background=1 the body is read, the import runs
+    as a job and the call returns 202 with its job_id (see /jobs).
+    """
+    try:
+        chunk_size = max(1, min(int(request.args.get("chunk_size", 5000)), 50000))
+    except ValueError:
+        return bad("chunk_size must be an integer")
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        records = parse_ndjson(request.stream)
+    else:
+        posts = (request.json or {}).get("posts")
+        if not isinstance(posts, list):
+            return bad("Send NDJSON or a JSON object with a `posts` list")
+        records = ((i, p, None) for i, p in enumerate(posts))
+
+    if request.args.get("background", "").lower() in ("1", "true", "yes"):
+        job_id = JOBS.submit("import_posts", {"chunk_size": chunk_size},
+                             payload=list(records))
+        return jsonify({"status": "Import started", "job_id": job_id}), 202
 
+    # each committed chunk bumps "posts"/"users" itself (bulk_import.py)
+    with db_cursor() as (conn, cur):
+        summary = import_posts(conn, cur, records, chunk_size)
+    return jsonify({"status": "Import finished", **summary}), 201
+
+def repost_item(d):
+    """(original_post_id, reposter_username, repost_datetime) or ValueError."""
+    if not isinstance(d, dict):
+        raise ValueError("Missing required fields")
+    original_post_id = d.get("original_post_id")
+    reposter_username = d.get("reposter_username")
+    repost_time = d.get("repost_time")
     if not original_post_id or not reposter_username or not repost_time:
-        return jsonify({"status": "Missing required fields"}), 400
+        raise ValueError("Missing required fields")
+    try:
+        original_post_id = int(original_post_id)
+    except (TypeError, ValueError):
+        raise ValueError("original_post_id must be an integer")
+    if not isinstance(reposter_username, str):
+        raise ValueError("reposter_username must be a string")
+    if not isinstance(repost_time, str) or not valid_datetime(repost_time):
+        raise ValueError("Invalid repost time format")
+    return original_post_id, reposter_username, parse_datetime(repost_time)
 
-    if not valid_datetime(repost_time):
-        return jsonify({"status": "Invalid repost time format"}), 400
+@app.route("/repost", methods=["POST"])
+def repost():
+    """
+    {"original_post_id": 7, "reposter_username": "bob",
+     "repost_time": "2025-03-01 10:00:00"}
+    The reposter must exist on the original post's platform.  The
+    original is locked for the transaction, so concurrent reposts of the
+    same post serialise on its repost_count.
+    """
+    try:
+        original_post_id, reposter_username, repost_dt = repost_item(request.json)
+    except ValueError as e:
+        return jsonify({"status": str(e)}), 400
 
     with db_cursor() as (conn, cur):
-        try:
-            # Step 1: Get original post content and platform
-            cur.execute("SELECT content, social_media_id, post_time FROM Post WHERE id = %s", (original_post_id,))
-            original_post = cur.fetchone()
-            if not original_post:
-                return jsonify({"status": "Original post not found"}), 404
-
-            # Step 2: Validate repost time
-            original_time = original_post["post_time"]
-            repost_dt = datetime.strptime(repost_time, "%Y-%m-%d %H:%M:%S")
-            if repost_dt <= original_time:
-                return jsonify({"status": "Repost time must be after original post time"}), 400
-
-            # Step 3: Get reposter ID
-            cur.execute("SELECT id FROM `User` WHERE username = %s", (reposter_username,))
-            user_result = cur.fetchone()
-            if not user_result:
-                cur.fetchall()
-                return jsonify({"status": "Reposter user not found"}), 404
-            reposter_id = user_result["id"]
-
-            # Step 4: Create new post as a repost
-            cur.execute("""
-                INSERT INTO Post (user_id, social_media_id, post_time, content)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                reposter_id,
-                original_post["social_media_id"],
-                repost_time,
-                original_post["content"]
-            ))
-            repost_post_id = cur.lastrowid
-
-            # Step 5: Insert into Repost linking original and new
-            cur.execute("""
-                INSERT INTO Repost (original_post_id, repost_post_id, reposter_id, repost_time)
-                VALUES (%s, %s, %s, %s)
-            """, (original_post_id, repost_post_id, reposter_id, repost_time))
-            conn.commit()
+        original = reposts.lock_originals(cur, [original_post_id]).get(original_post_id)
+        if not original:
+            return jsonify({"status": "Original post not found"}), 404
+        if repost_dt <= original["post_time"]:
+            return jsonify({"status": "Repost time must be after original post time"}), 400
+
+        reposter_id = dim_cache.find_users(
+            conn, cur, original["social_media_id"], [reposter_username]
+        ).get(reposter_username.lower())
+        if not reposter_id:
+            return jsonify({"status": "Reposter user not found on this platform"}), 404
 
+        try:
+            reposts.insert_reposts(cur, [(original, reposter_id, repost_dt)])
         except mysql.connector.IntegrityError:
             conn.rollback()
             return jsonify({"status": "Duplicate repost not allowed"}), 400
+        commit_with_tags(conn, cur, "posts")
 
     return jsonify({"status": "Repost recorded"}), 201
 
+@app.route("/repost_batch", methods=["POST"])
+def repost_batch():
+    """
+    Bulk /repost for crawls:
+    {"reposts": [{"original_post_id": 7, "reposter_username": "bob",
+                  "repost_time": "2025-03-01 10:00:00"}, ...]}
+    Optional ?chunk_size=N (default 1000) reposts per transaction.  Each
+    chunk locks its originals, resolves reposters per platform and writes
+    with multi‑row statements.  Bad items are reported in "errors" by
+    index; the rest are recorded.
+    """
+    items = (request.json or {}).get("reposts")
+    if not isinstance(items, list):
+        return bad("reposts must be a list")
+    try:
+        chunk_size = max(1, min(int(request.args.get("chunk_size", BULK_CHUNK)), 10000))
+    except ValueError:
+        return bad("chunk_size must be an integer")
+
+    errors, parsed = [], []
+    for i, d in enumerate(items):
+        try:
+            parsed.append((i, *repost_item(d)))
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+
+    recorded = 0
+    with db_cursor() as (conn, cur):
+        for part in chunks(parsed, chunk_size):
+            originals = reposts.lock_originals(cur, [p[1] for p in part])
+
+            by_media = {}
+            for i, oid, username, dt in part:
+                if oid in originals:
+                    by_media.setdefault(originals[oid]["social_media_id"], []).append(username)
+            users = {
+                (mid, name): uid
+                for mid, names in by_media.items()
+                for name, uid in dim_cache.find_users(conn, cur, mid, names).items()
+            }
+
+            rows, refs, seen = [], [], set()
+            for i, oid, username, dt in part:
+                orig = originals.get(oid)
+                if not orig:
+                    errors.append({"index": i, "error": "Original post not found"})
+                    continue
+                if dt <= orig["post_time"]:
+                    errors.append({"index": i, "error": "Repost time must be after original post time"})
+                    continue
+                uid = users.get((orig["social_media_id"], username.lower()))
+                if not uid:
+                    errors.append({"index": i, "error": "Reposter user not found on this platform"})
+                    continue
+                key = (uid, orig["social_media_id"], dt)
+                if key in seen:
+                    errors.append({"index": i, "error": "Duplicate repost not allowed"})
+                    continue
+                seen.add(key)
+                rows.append((orig, uid, dt))
+                refs.append(i)
+
+            taken = reposts.existing_posts(cur, [(uid, o["social_media_id"], dt)
+                                                 for o, uid, dt in rows])
+            keep = [(r, i) for r, i in zip(rows, refs)
+                    if (r[1], r[0]["social_media_id"], r[2]) not in taken]
+            errors += [{"index": i, "error": "Duplicate repost not allowed"}
+                       for r, i in zip(rows, refs)
+                       if (r[1], r[0]["social_media_id"], r[2]) in taken]
+            if keep:
+                reposts.insert_reposts(cur, [r for r, _ in keep])
+                recorded += len(keep)
+            commit_with_tags(conn, cur, "posts")
+
+    errors.sort(key=lambda e: e["index"])
+    return jsonify({
+        "status": "Reposts recorded",
+        "received": len(items),
+        "recorded": recorded,
+        "errors": errors,
+    }), 201 if recorded or not errors else 400
+
+
+def link_posts(cur, project_id, post_ids):
+    """
+    Link *post_ids* to a project, BULK_CHUNK ids per statement pair: one
+    SELECT finds the ids that exist, one multi‑row INSERT IGNORE links
+    them.  Returns (unknown_ids, newly_linked); the caller commits and
+    updates the counters.
+    """
+    unknown, linked = [], 0
+    for part in chunks(dict.fromkeys(post_ids)):
+        in_clause, in_vals = sql_in(part)
+        cur.execute(f"SELECT id FROM Post WHERE id IN {in_clause}", in_vals)
+        known = {r["id"] for r in cur.fetchall()}
+        unknown += [p for p in part if p not in known]
+        if known:
+            values, vals = sql_values([(project_id, p) for p in part if p in known])
+            cur.execute(
+                f"INSERT IGNORE INTO ProjectPost (project_id, post_id) VALUES {values}",
+                vals,
+            )
+            linked += cur.rowcount
+    return unknown, linked
+
+@app.route("/assign_posts_to_project", methods=["POST"])
+def assign_posts_to_project():
+    """
+    Bulk /assign_post_to_project:
+      {"project_id": 3, "post_ids": [12, 18, 44, ...]}
+    Links every existing post in one transaction and reports the ids
+    that do not exist.
+    """
+    d = request.json or {}
+    post_ids = d.get("post_ids")
+    if not isinstance(d.get("project_id"), int) or not isinstance(post_ids, list):
+        return bad("project_id and post_ids are required")
+    if not all(isinstance(p, int) and not isinstance(p, bool) for p in post_ids):
+        return bad("`post_ids` must be a list of integers")
+    project_id = d["project_id"]
+
+    with db_cursor() as (conn, cur):
+        cur.execute("SELECT id FROM Project WHERE id=%s", (project_id,))
+        if not cur.fetchone():
+            return bad("Project not found", 404)
+        unknown, linked = link_posts(cur, project_id, post_ids)
+        project_stats.add_posts(cur, project_id, linked)
+        commit_with_tags(conn, cur, *project_tags(project_id))
+
+    unique = len(set(post_ids))
+    return jsonify({
+        "status": "Posts assigned",
+        "received": len(post_ids),
+        "linked": linked,
+        "already_linked": unique - len(unknown) - linked,
+        "unknown_ids": unknown,
+    }), 201
+
+ASSIGN_BATCH = 50_000   # Post.id span per INSERT … SELECT in background runs
+
+def assign_by_filter(project_id, flt, progress=None):
+    """
+    Link every post matching *flt* to *project_id* with INSERT … SELECT –
+    the ids never leave MySQL.  Without *progress* this is one statement;
+    with it, Post.id is walked in ASSIGN_BATCH spans, each committed on
+    its own, and progress(fraction, linked_so_far) is called after each.
+    Returns the number of newly linked posts.
+    """
+    tags = project_tags(project_id)
+    with db_cursor() as (conn, cur):
+        if progress is None:
+            cur.execute(assign_sql(flt.shape), (project_id, *flt.params()))
+            linked = cur.rowcount
+            project_stats.add_posts(cur, project_id, linked)
+            commit_with_tags(conn, cur, *tags)
+            return linked
+
+        cur.execute("SELECT MIN(id) AS lo, MAX(id) AS hi FROM Post")
+        span = cur.fetchone()
+        linked = 0
+        if span["lo"] is not None:
+            lo, hi = span["lo"], span["hi"]
+            for start in range(lo, hi + 1, ASSIGN_BATCH):
+                end = min(start + ASSIGN_BATCH - 1, hi)
+                cur.execute(assign_sql(flt.shape, ranged=True),
+                            (project_id, *flt.params(), start, end))
+                linked += cur.rowcount
+                project_stats.add_posts(cur, project_id, cur.rowcount)
+                commit_with_tags(conn, cur, *tags)
+                progress((end - lo + 1) / (hi - lo + 1), linked)
+        return linked
+
+def assign_filter(spec):
+    """
+    PostFilter from a JSON filter object; FilterError if empty or bad.
+    Stricter than /search_post, which ignores what it does not know: a
+    misspelt key here would silently widen a write to every post.
+    """
+    unknown = sorted(set(spec) - set(FILTER_KEYS))
+    if unknown:
+        raise FilterError(f"unknown filter key(s): {', '.join(unknown)}")
+    if bool(spec.get("from_time")) != bool(spec.get("to_time")):
+        raise FilterError("from_time and to_time must be given together")
+    flt = PostFilter({k: str(v) for k, v in spec.items() if v is not None})
+    if not flt.shape:
+        raise FilterError("filter matches every post; give at least one filter key")
+    return flt
+
+@app.route("/assign_posts_by_filter", methods=["POST"])
+def assign_posts_by_filter():
+    """
+    Materialise a search into a project:
+      {"project_id": 3,
+       "filter": {"social_media": "Twitter", "from_time": "...", "to_time": "...",
+                  "username": ..., "first_name": ..., "last_name": ...,
+                  "name_match": "prefix", "content": ...},
+       "background": false}
+    The filter keys are those of /search_post; at least one is required.
+    With "background": true the call returns 202 and a job_id at once;
+    poll /jobs/<job_id> for progress.
+    """
+    d = request.json or {}
+    if not isinstance(d.get("project_id"), int) or not isinstance(d.get("filter"), dict):
+        return bad("project_id and filter are required")
+    project_id = d["project_id"]
+    try:
+        flt = assign_filter(d["filter"])
+    except FilterError as e:
+        return bad(str(e))
+
+    with db_cursor() as (conn, cur):
+        cur.execute("SELECT id FROM Project WHERE id=%s", (project_id,))
+        if not cur.fetchone():
+            return bad("Project not found", 404)
+
+    if not d.get("background"):
+        linked = assign_by_filter(project_id, flt)
+        return jsonify({"status": "Posts assigned", "linked": linked}), 201
+
+    job_id = JOBS.submit("assign_by_filter",
+                         {"project_id": project_id, "filter": d["filter"]})
+    return jsonify({"status": "Assignment started", "job_id": job_id}), 202
 
 @app.route("/assign_post_to_project", methods=["POST"])
 def assign_post_to_project():
     d = request.json or {}
     if "project_id" not in d or "post_id" not in d:
         return bad("project_id and post_id required")
+    try:
+        project_id, post_id = int_field(d, "project_id"), int_field(d, "post_id")
+    except ValueError as e:
+        return bad(str(e))
     with db_cursor() as (conn, cur):
+        if not row_exists(cur, "Project", project_id):
+            return bad("Project not found", 404)
+        if not row_exists(cur, "Post", post_id):
+            return bad("Post not found", 404)
         cur.execute(
             "INSERT IGNORE INTO ProjectPost (project_id, post_id) VALUES (%s,%s)",
-            (d["project_id"], d["post_id"]),
+            (project_id, post_id),
         )
+        if cur.rowcount:
+            project_stats.add_posts(cur, project_id, 1)
+        commit_with_tags(conn, cur, *project_tags(project_id))
     return jsonify({"status": "Post assigned"}), 201
 
 
@@ -469,11 +1179,21 @@ def add_field():
     d = request.json or {}
     if "project_id" not in d or "field_name" not in d:
         return bad("project_id and field_name required")
+    name = d["field_name"]
+    if not isinstance(name, str) or not name.strip() or len(name) > 100:
+        return bad("field_name must be 1–100 characters")
+    try:
+        project_id = int_field(d, "project_id")
+    except ValueError as e:
+        return bad(str(e))
     with db_cursor() as (conn, cur):
+        if not row_exists(cur, "Project", project_id):
+            return bad("Project not found", 404)
         cur.execute(
             "INSERT IGNORE INTO ProjectField (name, project_id) VALUES (%s,%s)",
-            (d["field_name"], d["project_id"]),
+            (name, project_id),
         )
+        commit_with_tags(conn, cur, *project_tags(project_id))
     return jsonify({"status": "Field added"}), 201
 
 
@@ -497,40 +1217,40 @@ def enter_analysis_result():
     d = request.json or {}
     if any(k not in d for k in ("project_id", "post_id", "results")):
         return bad("project_id, post_id, and results are required", 400)
+    try:
+        project_id, post_id = int_field(d, "project_id"), int_field(d, "post_id")
+    except ValueError as e:
+        return bad(str(e))
+    if not isinstance(d["results"], dict) or not d["results"]:
+        return bad("results must be a non‑empty object")
 
     with db_cursor() as (conn, cur):
+        if not row_exists(cur, "Project", project_id):
+            return bad("Project not found", 404)
         # 1) ensure the post is linked to the project
         cur.execute(
             "SELECT id FROM ProjectPost WHERE project_id=%s AND post_id=%s",
-            (d["project_id"], d["post_id"])
+            (project_id, post_id)
         )
         row = cur.fetchone()
         if not row:
+            if not row_exists(cur, "Post", post_id):
+                return bad("Post not found", 404)
             # link it automatically
             cur.execute(
                 "INSERT INTO ProjectPost (project_id, post_id) VALUES (%s, %s)",
-                (d["project_id"], d["post_id"])
+                (project_id, post_id)
             )
             project_post_id = cur.lastrowid
+            project_stats.add_posts(cur, project_id, 1)
         else:
             project_post_id = row['id']
 
         # 2) upsert each field/value pair, auto‑creating fields as needed
+        new_fills = {}
         for field_name, value in d["results"].items():
             # 2a) get or create the field
-            cur.execute(
-                "SELECT id FROM ProjectField WHERE name=%s AND project_id=%s",
-                (field_name, d["project_id"])
-            )
-            f = cur.fetchone()
-            if f:
-                field_id = f['id']
-            else:
-                cur.execute(
-                    "INSERT INTO ProjectField (name, project_id) VALUES (%s, %s)",
-                    (field_name, d["project_id"])
-                )
-                field_id = cur.lastrowid
+            field_id = dim_cache.field_id(conn, cur, project_id, field_name)
 
             # 2b) upsert the analysis result
             cur.execute(
@@ -543,16 +1263,209 @@ def enter_analysis_result():
                 """,
                 (project_post_id, field_id, str(value))
             )
-        conn.commit()
+            if cur.rowcount == 1:            # 1 = inserted, 2/0 = updated
+                new_fills[field_id] = 1
+        project_stats.add_fills(cur, project_id, new_fills)
+        commit_with_tags(conn, cur, *project_tags(project_id))
 
     return jsonify({"status": "Results saved"}), 201
 
+@app.route("/enter_analysis_results", methods=["POST"])
+def enter_analysis_results():
+    """
+    Bulk variant of /enter_analysis_result.
+    JSON payload:
+    {
+      "project_id": 3,
+      "records": [
+          {"post_id": 1, "results": {"sentiment": "positive"}},
+          {"post_id": 2, "results": {"sentiment": "negative", "objects": "2"}}
+      ]
+    }
+    Links, fields and results are resolved with multi‑row statements in
+    one transaction.  Records that fail validation (or name an unknown
+    post, or a field that cannot be resolved) are reported in "errors"
+    by index; the rest are saved.
+    """
+    d = request.json or {}
+    records = d.get("records")
+    if "project_id" not in d or not isinstance(records, list):
+        return bad("project_id and records are required")
+    try:
+        project_id = int_field(d, "project_id")
+    except ValueError as e:
+        return bad(str(e))
+
+    errors = []
+    by_post = {}                     # post_id -> {field: value}
+    accepted = []                    # (index, post_id, results) that passed
+    for i, rec in enumerate(records):
+        if not isinstance(rec, dict) or isinstance(rec.get("post_id"), bool) \
+                or not isinstance(rec.get("post_id"), int):
+            errors.append({"index": i, "error": "post_id must be an integer"})
+            continue
+        res = rec.get("results")
+        if not isinstance(res, dict) or not res:
+            errors.append({"index": i, "post_id": rec["post_id"],
+                           "error": "results must be a non‑empty object"})
+            continue
+        if any(not isinstance(k, str) or not k.strip() or len(k) > 100 for k in res):
+            errors.append({"index": i, "post_id": rec["post_id"],
+                           "error": "field names must be 1–100 characters"})
+            continue
+        by_post.setdefault(rec["post_id"], {}).update(res)
+        accepted.append((i, rec["post_id"], res))
+
+    with db_cursor() as (conn, cur):
+        cur.execute("SELECT id FROM Project WHERE id=%s", (project_id,))
+        if not cur.fetchone():
+            return bad("Project not found", 404)
+
+        # 1) drop unknown posts
+        known = set()
+        for part in chunks(by_post):
+            in_clause, in_vals = sql_in(part)
+            cur.execute(f"SELECT id FROM Post WHERE id IN {in_clause}", in_vals)
+            known.update(r["id"] for r in cur.fetchall())
+        for i, post_id, _ in accepted:
+            if post_id not in known:
+                errors.append({"index": i, "post_id": post_id,
+                               "error": "Post not found"})
+        by_post = {pid: res for pid, res in by_post.items() if pid in known}
+
+        # 2) create any missing fields, then map every requested name to
+        #    its field id.  MySQL matches names by the column's collation
+        #    (case, accents, …), so the mapping is made by the server: one
+        #    `name = %s` probe per requested name, echoing that name back.
+        names = sorted({k for res in by_post.values() for k in res})
+        field_ids = {}
+        for part in chunks(names):
+            values, vals = sql_values([(n, project_id) for n in part])
+            cur.execute(
+                f"INSERT IGNORE INTO ProjectField (name, project_id) VALUES {values}",
+                vals,
+            )
+            cur.execute(
+                " UNION ALL ".join(
+                    ["SELECT %s AS requested, id FROM ProjectField "
+                     "WHERE project_id=%s AND name=%s"] * len(part)
+                ),
+                tuple(v for n in part for v in (n, project_id, n)),
+            )
+            field_ids.update({r["requested"]: r["id"] for r in cur.fetchall()})
+        for i, post_id, res in accepted:
+            lost = [k for k in res if k not in field_ids]
+            if post_id in by_post and lost:
+                errors.append({"index": i, "post_id": post_id,
+                               "error": f"field could not be resolved: {lost[0]}"})
+        by_post = {pid: res for pid, res in by_post.items()
+                   if all(k in field_ids for k in res)}
+
+        # 3) link posts to the project, then read back (and lock) the link
+        #    rows in post id order: a concurrent call writing the same
+        #    links waits here, so the counts in 4) are not taken twice
+        link_ids = {}
+        linked = 0
+        for part in chunks(sorted(by_post)):
+            values, vals = sql_values([(project_id, pid) for pid in part])
+            cur.execute(
+                f"INSERT IGNORE INTO ProjectPost (project_id, post_id) VALUES {values}",
+                vals,
+            )
+            linked += cur.rowcount
+            in_clause, in_vals = sql_in(part)
+            cur.execute(
+                f"SELECT id, post_id FROM ProjectPost "
+                f"WHERE project_id=%s AND post_id IN {in_clause} "
+                f"ORDER BY post_id FOR UPDATE",
+                (project_id, *in_vals),
+            )
+            link_ids.update({r["post_id"]: r["id"] for r in cur.fetchall()})
+
+        # 4) multi‑row upsert of every (link, field, value); pairs that
+        #    did not exist yet feed the completion counters
+        rows = [
+            (link_ids[pid], field_ids[k], str(v))
+            for pid, res in by_post.items()
+            for k, v in res.items()
+        ]
+        existing = set()
+        for part in chunks(link_ids.values()):
+            in_clause, in_vals = sql_in(part)
+            cur.execute(
+                f"SELECT project_post_id, field_id FROM AnalysisResult "
+                f"WHERE project_post_id IN {in_clause} FOR UPDATE",
+                in_vals,
+            )
+            existing.update((r["project_post_id"], r["field_id"]) for r in cur.fetchall())
+        new_fills = {}
+        for link, fid in {(r[0], r[1]) for r in rows}:
+            if (link, fid) not in existing:
+                new_fills[fid] = new_fills.get(fid, 0) + 1
+        project_stats.add_posts(cur, project_id, linked)
+        project_stats.add_fills(cur, project_id, new_fills)
+
+        for part in chunks(rows):
+            values, vals = sql_values(part)
+            cur.execute(
+                f"""
+                INSERT INTO AnalysisResult (project_post_id, field_id, value)
+                VALUES {values}
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+                """,
+                vals,
+            )
+        commit_with_tags(conn, cur, *project_tags(project_id))
+
+    errors.sort(key=lambda e: e["index"])
+    return jsonify({
+        "status": "Results saved",
+        "posts_saved": len(by_post),
+        "values_saved": len(rows),
+        "errors": errors,
+    }), 201 if by_post or not errors else 400
+
+@app.route("/field_completion", methods=["GET"])
+@conditional(["project:*"])
+@CACHE.cached(["project:*"])
+def field_completion_route():
+    """
+    Field fill counts for many projects in one call:
+      /field_completion?project_id=1&project_id=2    (or project_ids=1,2)
+    Optional post_ids=4,5,6 restricts the counts to that post subset.
+    """
+    try:
+        pids, post_ids = completion_args(request.args.getlist("project_id"),
+                                         request.args)
+    except ValueError as e:
+        return bad(str(e))
+
+    with db_cursor() as (conn, cur):
+        stats = field_completion(cur, pids, post_ids or None)
+    return jsonify({"projects": stats})
+
+def completion_args(project_id_list, args):
+    """(project_ids, post_ids) for /field_completion; ValueError if malformed."""
+    try:
+        pids = [int(p) for p in project_id_list]
+        pids += [int(p) for p in args.get("project_ids", "").split(",") if p.strip()]
+        post_ids = [int(p) for p in args.get("post_ids", "").split(",") if p.strip()]
+    except ValueError:
+        raise ValueError("project and post ids must be integers") from None
+    if not pids:
+        raise ValueError("Provide project_id or project_ids")
+    return list(dict.fromkeys(pids)), post_ids
+
 @app.route("/query_project_analysis", methods=["GET"])
+@conditional(analysis_tags)
+@CACHE.cached(analysis_tags)
 def query_project_analysis():
     pid = request.args.get("project_id")
     name = request.args.get("project_name")
     if not pid and not name:
         return bad("Provide project_id or project_name")
+    if pid and not pid.isdigit():
+        return bad("project_id must be an integer")
 
     with db_cursor() as (conn, cur):
         if name and not pid:
@@ -561,100 +1474,158 @@ def query_project_analysis():
             if not row:
                 return bad("Project not found", 404)
             pid = row["id"]
+        return jsonify(project_analysis(conn, cur, pid))
+
+def project_analysis(conn, cur, pid):
+    """/query_project_analysis payload: {"posts": [...], "field_completion"}."""
+    # ---- 1. posts + results in one pass --------------------------------
+    stream = conn.cursor(dictionary=True)       # unbuffered
+    stream.execute(ANALYSIS_SQL, (pid,))
+    posts = analysis_posts(stream)
+    stream.close()
+
+    # ---- 3. field % based on ALL posts in experiment -------------------
+    completion = completion_pcts(project_stats.read_completion(cur, pid))
+
+    return {"posts": posts, "field_completion": completion}
+
+# One LEFT JOIN ordered by post id; rows for the same post arrive
+# together, so results are folded in while the rows stream in.
+ANALYSIS_SQL = """
+    SELECT p.id, p.content, sm.name AS social_media,
+           u.username, p.post_time,
+           f.name AS field_name, ar.value
+    FROM ProjectPost pp
+    JOIN Post p             ON pp.post_id = p.id
+    JOIN `User`       u     ON p.user_id  = u.id
+    JOIN SocialMedia sm     ON p.social_media_id = sm.id
+    LEFT JOIN AnalysisResult ar ON ar.project_post_id = pp.id
+    LEFT JOIN ProjectField   f  ON ar.field_id = f.id
+    WHERE pp.project_id = %s
+    ORDER BY pp.post_id
+"""
+
+def analysis_posts(rows):
+    """Fold ANALYSIS_SQL *rows* into one post per id with its results."""
+    posts, post = [], None
+    for row in rows:
+        if post is None or post["id"] != row["id"]:
+            post = {
+                "id": row["id"],
+                "content": row["content"],
+                "social_media": row["social_media"],
+                "username": row["username"],
+                "post_time": row["post_time"],
+                "results": {},
+            }
+            posts.append(post)
+        if row["field_name"] is not None:
+            post["results"][row["field_name"]] = row["value"]
+    return posts
 
-        # ---- 1. all posts in the experiment --------------------------------
-        cur.execute(
-            """
-            SELECT p.id, p.content, sm.name AS social_media,
-                   u.username, p.post_time
-            FROM Post p
-            JOIN ProjectPost pp ON pp.post_id = p.id
-            JOIN `User`       u ON p.user_id  = u.id
-            JOIN SocialMedia sm ON p.social_media_id = sm.id
-            WHERE pp.project_id = %s
-            """,
-            (pid,),
-        )
-        posts = cur.fetchall()
-
-        # ---- 2. attach per‑post results ------------------------------------
-        for post in posts:
-            cur.execute(
-                """
-                SELECT f.name, ar.value
-                FROM AnalysisResult ar
-                JOIN ProjectField f ON ar.field_id = f.id
-                JOIN ProjectPost pp ON ar.project_post_id = pp.id
-                WHERE pp.project_id = %s AND pp.post_id = %s
-                """,
-                (pid, post["id"]),
-            )
-            post["results"] = {r["name"]: r["value"] for r in cur.fetchall()}
-
-        # ---- 3. field % based on ALL posts in experiment -------------------
-        completion = field_pct(cur, pid)
-
-    return jsonify({"posts": posts, "field_completion": completion})
 
+@app.route("/export_project", methods=["GET"])
+@conditional(analysis_tags)
+def export_project():
+    """
+    ?project_id=3&format=arrow|parquet – the /query_project_analysis data
+    as one wide table (post metadata + one column per field), streamed
+    in record batches.  See export.py.
+    """
+    pid = request.args.get("project_id", "")
+    fmt = request.args.get("format", "parquet")
+    if not pid.isdigit():
+        return bad("project_id must be an integer")
+    if fmt not in export.FORMATS:
+        return bad(f"format must be one of {', '.join(export.FORMATS)}")
+    try:
+        export.require()
+    except RuntimeError as e:
+        return bad(str(e), 501)
+    with db_cursor() as (conn, cur):
+        cur.execute("SELECT id FROM Project WHERE id=%s", (pid,))
+        if not cur.fetchone():
+            return bad("Project not found", 404)
+
+    def generate():
+        with db_cursor(unlimited=True, buffered=False) as (_, cur):
+            yield from export.stream(cur, int(pid), fmt)
+
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype=export.FORMATS[fmt][0],
+        headers={"Content-Disposition":
+                 f'attachment; filename="{export.filename(pid, fmt)}"'},
+    )
 
 @app.route("/search_post", methods=["GET"])
 def search_post():
-    # Parse incoming parameters
-    social_media = request.args.get("social_media", "").strip()
-    username     = request.args.get("username", "").strip()
-    first_name   = request.args.get("first_name", "").strip()
-    last_name    = request.args.get("last_name", "").strip()
-    from_time    = request.args.get("from_time", "").strip()
-    to_time      = request.args.get("to_time", "").strip()
-
-    # Build base query
-    query = """
-        SELECT 
-            Post.id,
-            Post.content AS text,
-            Post.post_time,
-            SocialMedia.name AS social_media,
-            `User`.username,
-            Project.name AS project_name
-        FROM Post
-        JOIN `User`            ON Post.user_id = `User`.id
-        JOIN SocialMedia       ON Post.social_media_id = SocialMedia.id
-        LEFT JOIN ProjectPost  ON Post.id = ProjectPost.post_id
-        LEFT JOIN Project      ON ProjectPost.project_id = Project.id
-        WHERE 1=1
-    """
-
-    params = []
-
-    # Dynamically apply filters
-    if social_media:
-        query += " AND SocialMedia.name = %s"
-        params.append(social_media)
-    if username:
-        query += " AND `User`.username = %s"
-        params.append(username)
-    if first_name:
-        query += " AND LOWER(TRIM(`User`.first_name)) = %s"
-        params.append(first_name.lower().strip())
-    if last_name:
-        query += " AND LOWER(TRIM(`User`.last_name)) = %s"
-        params.append(last_name.lower().strip())
-    if from_time and to_time:
-        query += " AND Post.post_time BETWEEN %s AND %s"
-        try:
-            from_dt = datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S")
-            to_dt   = datetime.strptime(to_time,   "%Y-%m-%d %H:%M:%S")
-            params.append(from_dt)
-            params.append(to_dt)
-        except ValueError:
-            return jsonify({"error": "Invalid datetime format"}), 400
+    # Parse incoming parameters (see query_filters.PostFilter)
+    try:
+        flt = PostFilter(request.args)
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    content  = flt.content
+    by_score = bool(content) and request.args.get("sort") == "relevance"
 
-    query += " ORDER BY Post.post_time DESC"
+    try:
+        limit, after = page_args("score" if by_score else "time")
+    except ValueError as e:
+        return bad(str(e))
+    if wants_stream():
+        limit = after = None        # a stream always covers the full range
+
+    query, params = search_query(flt, by_score, limit, after)
+
+    # Streaming: one flat line per (post, experiment) row
+    if wants_stream():
+        return ndjson_response(query, tuple(params), lambda rows: (
+            search_stream_row(r, content) for r in rows
+        ))
 
     # Execute query
-    with db_cursor() as (_, cur):
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
+    with db_cursor() as (conn, _):
+        rows = fetch_prepared(conn, query, params)
+    return jsonify(search_body(rows, content, by_score, limit))
+
+# The request‑independent halves of /search_post, shared with asgi_app.py
+def search_query(flt, by_score, limit, after):
+    content = flt.content
+    query = search_sql(flt.shape, bool(limit), bool(after), by_score)
+    params = ([content] if content else []) + flt.params()
+    if limit:
+        if after and by_score:
+            params += [content, after[0], content, after[0], after[1]]
+        elif after:
+            params += [after[0], after[0], after[1]]
+        params.append(limit + 1)
+    return query, params
+
+def search_row(row, content):
+    out = {
+        "id": row["id"],
+        "text": row["text"] or "",
+        "post_time": fmt_time(row["post_time"]),
+        "social_media": row["social_media"],
+        "username": row["username"]
+    }
+    if content:
+        out["score"] = float(row["score"])     # DECIMAL, see query_filters.SCORE
+    return out
+
+def search_stream_row(row, content):
+    return {**search_row(row, content), "experiment": row["project_name"] or "Unassigned"}
+
+def search_body(rows, content, by_score, limit):
+    """Group joined rows by experiment; cut the look‑ahead post of a page."""
+    next_cursor = None
+    if limit:
+        ids = list(dict.fromkeys(r["id"] for r in rows))
+        if len(ids) > limit:
+            rows = [r for r in rows if r["id"] != ids[limit]]
+            last = next(r for r in rows if r["id"] == ids[limit - 1])
+            next_cursor = (encode_cursor(last["score"], last["id"]) if by_score
+                           else time_cursor(last))
 
     # Organize posts by project/experiment
     result = {}
@@ -662,129 +1633,209 @@ def search_post():
         proj = row["project_name"] or "Unassigned"
         if proj not in result:
             result[proj] = {"posts": []}
-        result[proj]["posts"].append({
-            "id": row["id"],
-            "text": row["text"] or "",
-            "post_time": row["post_time"].strftime("%Y-%m-%d %H:%M:%S"),
-            "social_media": row["social_media"],
-            "username": row["username"]
-        })
+        result[proj]["posts"].append(search_row(row, content))
 
-    return jsonify({"experiments": result})
+    if not limit:
+        return {"experiments": result}
+    return {"experiments": result, "next_cursor": next_cursor}
+
+def group_experiments(posts, rows):
+    """
+    Fold joined (project_name, post_id, field_name, value) rows into
+    {experiment: {"posts": [...]}}.
+
+    Every experiment keeps its own id‑keyed copy of each post, so results
+    from one project never show up under another, and each row costs one
+    dict lookup – linear in len(rows).
+    """
+    post_lookup = {p["id"]: p for p in posts}
+    grouped = {}                     # exp -> posts by id
+
+    for row in rows:
+        exp_posts = grouped.setdefault(row["project_name"], {})
+        pid = row["post_id"]
+        fld = row["field_name"]
+
+        post = exp_posts.get(pid)
+        if post is None:
+            post = exp_posts[pid] = {**post_lookup[pid], "results": {}}
+        if fld:
+            post["results"][fld] = row["value"]
+
+    return {exp: {"posts": list(exp_posts.values())}
+            for exp, exp_posts in grouped.items()}
 
 @app.route("/combo_post_to_experiment", methods=["GET"])
 def combo_post_to_experiment():
-    # Parse filters from request
-    social_media = request.args.get("social_media", "").strip()
-    username     = request.args.get("username", "").strip()
-    first_name   = request.args.get("first_name", "").strip()
-    last_name    = request.args.get("last_name", "").strip()
-    from_time    = request.args.get("from_time", "").strip()
-    to_time      = request.args.get("to_time", "").strip()
-
     # Step 1: Use same filtering logic as search_post()
-    query = """
-        SELECT 
-            Post.id,
-            Post.content AS text,
-            Post.post_time,
-            SocialMedia.name AS social_media,
-            `User`.username,
-            Project.name AS project_name
-        FROM Post
-        JOIN `User`            ON Post.user_id = `User`.id
-        JOIN SocialMedia       ON Post.social_media_id = SocialMedia.id
-        LEFT JOIN ProjectPost  ON Post.id = ProjectPost.post_id
-        LEFT JOIN Project      ON ProjectPost.project_id = Project.id
-        WHERE 1=1
-    """
-    params = []
-
-    if social_media:
-        query += " AND SocialMedia.name = %s"
-        params.append(social_media)
-    if username:
-        query += " AND `User`.username = %s"
-        params.append(username)
-    if first_name:
-        query += " AND LOWER(TRIM(`User`.first_name)) = %s"
-        params.append(first_name.lower().strip())
-    if last_name:
-        query += " AND LOWER(TRIM(`User`.last_name)) = %s"
-        params.append(last_name.lower().strip())
-    if from_time and to_time:
-        try:
-            from_dt = datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S")
-            to_dt   = datetime.strptime(to_time,   "%Y-%m-%d %H:%M:%S")
-            query += " AND Post.post_time BETWEEN %s AND %s"
-            params.append(from_dt)
-            params.append(to_dt)
-        except ValueError:
-            return jsonify({"error": "Invalid datetime format"}), 400
-
-    query += " ORDER BY Post.post_time DESC"
+    try:
+        flt = PostFilter(request.args)
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    params = flt.params()
+
+    # Streaming: one line per (post, experiment) with its results, built
+    # from a single join whose rows arrive grouped by ProjectPost.id.
+    # Field completion needs the whole set, so it is not part of the stream.
+    if wants_stream():
+        return ndjson_response(combo_stream_sql(flt.shape), tuple(params),
+                               combo_stream_items)
 
-    with db_cursor(dictionary=True) as (_, cur):
-        cur.execute(query, tuple(params))
-        posts = cur.fetchall()
+    with db_cursor() as (conn, cur):
+        posts = fetch_prepared(conn, combo_posts_sql(flt.shape), params)
 
         if not posts:
             return jsonify({"experiments": {}})
 
-        # Step 2: Extract post IDs and lookup
+        # Step 2: Extract post IDs
         post_ids = [p["id"] for p in posts]
-        post_lookup = {p["id"]: p for p in posts}
 
         # Step 3: Fetch project association + results for those post_ids
-        format_strings = ','.join(['%s'] * len(post_ids))
-        cur.execute(f"""
-            SELECT
-                Project.name AS project_name,
-                Post.id AS post_id,
-                ProjectPost.id AS project_post_id,
-                ProjectField.name AS field_name,
-                AnalysisResult.value
-            FROM ProjectPost
-            JOIN Post           ON ProjectPost.post_id = Post.id
-            JOIN Project        ON ProjectPost.project_id = Project.id
-            LEFT JOIN AnalysisResult ON ProjectPost.id = AnalysisResult.project_post_id
-            LEFT JOIN ProjectField   ON AnalysisResult.field_id = ProjectField.id
-            WHERE Post.id IN ({format_strings})
-        """, post_ids)
+        cur.execute(*combo_results_query(post_ids))
         rows = cur.fetchall()
 
+        # Step 5: % completion over the matching posts, per experiment
+        exp_ids = {r["project_name"]: r["project_id"] for r in rows}
+        completion = field_completion(cur, list(exp_ids.values()), post_ids)
+
+    return jsonify(combo_body(posts, rows, exp_ids, completion))
+
+# The request‑independent parts of /combo_post_to_experiment, shared
+# with asgi_app.py
+def combo_stream_items(rows):
+    """One item per (post, experiment) from combo_stream_sql() rows, which
+    arrive grouped by ProjectPost.id."""
+    item, link = None, None
+    for r in rows:
+        if r["project_post_id"] != link:
+            if item:
+                yield item
+            link = r["project_post_id"]
+            item = {
+                "experiment": r["project_name"],
+                "id": r["id"],
+                "text": r["text"] or "",
+                "post_time": fmt_time(r["post_time"]),
+                "social_media": r["social_media"],
+                "username": r["username"],
+                "results": {},
+            }
+        if r["field_name"]:
+            item["results"][r["field_name"]] = r["value"]
+    if item:
+        yield item
+
+def combo_results_query(post_ids):
+    """Project links and results of *post_ids*."""
+    format_strings = ','.join(['%s'] * len(post_ids))
+    return f"""
+        SELECT
+            Project.id AS project_id,
+            Project.name AS project_name,
+            Post.id AS post_id,
+            ProjectPost.id AS project_post_id,
+            ProjectField.name AS field_name,
+            AnalysisResult.value
+        FROM ProjectPost
+        JOIN Post           ON ProjectPost.post_id = Post.id
+        JOIN Project        ON ProjectPost.project_id = Project.id
+        LEFT JOIN AnalysisResult ON ProjectPost.id = AnalysisResult.project_post_id
+        LEFT JOIN ProjectField   ON AnalysisResult.field_id = ProjectField.id
+        WHERE Post.id IN ({format_strings})
+    """, tuple(post_ids)
+
+def combo_body(posts, rows, exp_ids, completion):
     # Step 4: Organize by experiment
-    experiments = {}
-    field_totals = {}
-
-    for row in rows:
-        exp = row["project_name"]
-        pid = row["post_id"]
-        fld = row["field_name"]
-        val = row["value"]
-
-        if exp not in experiments:
-            experiments[exp] = {"posts": [], "field_completion": {}}
-            field_totals[exp] = {}
-
-        # Attach result to the correct post
-        if "results" not in post_lookup[pid]:
-            post_lookup[pid]["results"] = {}
-        if fld:
-            post_lookup[pid]["results"][fld] = val
-            field_totals[exp][fld] = field_totals[exp].get(fld, 0) + 1
+    experiments = group_experiments(posts, rows)
+    for exp, meta in experiments.items():
+        meta["field_completion"] = completion_pcts(completion[exp_ids[exp]])
+    return {"experiments": experiments}
 
-        # Only add post to experiment once
-        if not any(p["id"] == pid for p in experiments[exp]["posts"]):
-            experiments[exp]["posts"].append(post_lookup[pid])
+# ===============================================================
+#  2.  BACKGROUND JOBS  (queue in jobs.py, state in the Job table)
+# ===============================================================
+def job_project_analysis(ctx, params, payload):
+    pid = int(params["project_id"])
+    with db_cursor(unlimited=True) as (conn, cur):
+        return project_analysis(conn, cur, pid)
+
+def job_assign_by_filter(ctx, params, payload):
+    flt = assign_filter(params["filter"])
+    linked = assign_by_filter(int(params["project_id"]), flt,
+                              lambda fraction, n: ctx.progress(fraction, linked=n))
+    return {"linked": linked}
+
+def job_import_posts(ctx, params, payload):
+    total = len(payload) or 1
+    with db_cursor() as (conn, cur):
+        return import_posts(
+            conn, cur, payload, params.get("chunk_size", 5000),
+            progress=lambda s: ctx.progress(s["received"] / total,
+                                            received=s["received"],
+                                            inserted=s["inserted"]),
+        )
 
-    # Step 5: Calculate % completion
-    for exp, meta in experiments.items():
-        total_posts = len(meta["posts"])
-        for fld, count in field_totals[exp].items():
-            meta["field_completion"][fld] = f"{(count / total_posts * 100):.1f}%"
+JOBS.register("project_analysis", job_project_analysis)
+JOBS.register("assign_by_filter", job_assign_by_filter)
+JOBS.register("import_posts", job_import_posts, public=False)   # /import_posts?background=1
 
-    return jsonify({"experiments": experiments})
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    {"kind": "project_analysis", "params": {"project_id": 3}}
+    → 202 {"job_id": ...}; poll GET /jobs/<job_id>, then fetch
+    GET /jobs/<job_id>/result once its state is "done".
+    """
+    d = request.json or {}
+    kind, params = d.get("kind"), d.get("params", {})
+    if not isinstance(params, dict):
+        return bad("params must be an object")
+    if not JOBS.is_public(kind):
+        return bad(f"Unknown job kind: {kind}")
+    if kind == "assign_by_filter":
+        try:
+            assign_filter(params.get("filter") or {})
+        except FilterError as e:
+            return bad(str(e))
+    try:
+        job_id = JOBS.submit(kind, params)
+    except UnknownJobKind as e:
+        return bad(str(e))
+    return jsonify({"status": "Job queued", "job_id": job_id}), 202
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    state = request.args.get("state")
+    if state and state not in STATES:
+        return bad(f"state must be one of {', '.join(STATES)}")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 500))
+    except ValueError:
+        return bad("limit must be an integer")
+    return jsonify({"jobs": JOBS.recent(state, limit)})
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = JOBS.status(job_id)
+    if job is None:
+        return bad("Job not found", 404)
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    state, result = JOBS.result(job_id)
+    if state is None:
+        return bad("Job not found", 404)
+    if state != "done":
+        return jsonify({"error": f"Job is {state}", "state": state}), 409
+    return jsonify(result)
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    state = JOBS.cancel(job_id)
+    if state is None:
+        return bad("Job not found", 404)
+    return jsonify({"job_id": job_id, "state": state})
 
 # ===============================================================
 #  MAIN
@@ -0,0 +1,477 @@
+# ================================================================
+#  asgi_app.py  –  ASGI entry point (Starlette + aiomysql)
+#
+#      uvicorn asgi_app:app --port 5002
+#
+#  Every GET route that reads MySQL is served by an async handler on an
+#  aiomysql pool, so one process can keep thousands of slow queries in
+#  flight without a thread per request.  They build their SQL and their
+#  JSON with the same helpers as app.py, so responses, paging cursors
+#  and ETags are identical in both modes.  The write routes, the export
+#  and the job endpoints fall through to the Flask app via
+#  WSGIMiddleware: their transactions are built on the synchronous
+#  helpers (dim_cache, bulk_import, jobs) and are short next to reads.
+#  The pool's statement_timeout applies here too, except to streams.
+#
+#  Needs:  pip install starlette aiomysql uvicorn
+# ================================================================
+import asyncio, json
+from contextlib import asynccontextmanager
+
+import aiomysql
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as wsgi
+import data_version, project_stats, reposts
+from query_filters import PostFilter, FilterError, combo_posts_sql, combo_stream_sql
+
+# ---------------------------------------------------------------
+#  Async connection pool – same settings as the WSGI pool
+# ---------------------------------------------------------------
+APOOL = None
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global APOOL
+    cfg = wsgi.DB_CFG
+    APOOL = await aiomysql.create_pool(
+        host=cfg.get("host", "localhost"), port=cfg.get("port", 3306),
+        user=cfg["user"], password=cfg.get("password", ""), db=cfg["database"],
+        minsize=0,
+        maxsize=wsgi.POOL_CFG.get("size", 5) + wsgi.POOL_CFG.get("max_overflow", 10),
+        pool_recycle=wsgi.POOL_CFG.get("recycle", 1800),
+        autocommit=True, charset="utf8mb4",
+        init_command=timeout_sql(wsgi.POOL.statement_timeout),
+    )
+    try:
+        yield
+    finally:
+        APOOL.close()
+        await APOOL.wait_closed()
+
+
+def timeout_sql(seconds):
+    """max_execution_time statement for *seconds* (None: no limit)."""
+    return f"SET SESSION max_execution_time = {int(seconds * 1000) if seconds else 0}"
+
+
+async def acquire():
+    """
+    A pooled connection, or PoolTimeout after the pool's wait timeout.
+    The acquire itself is shielded: if we give up (timeout, or the
+    client went away) just as it completes, the connection it got is
+    handed back instead of leaking out of the pool.
+    """
+    pending = asyncio.ensure_future(APOOL.acquire())
+
+    def give_back(fut):
+        if not fut.cancelled() and fut.exception() is None:
+            APOOL.release(fut.result())
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(pending),
+                                      wsgi.POOL_CFG.get("timeout", 5.0))
+    except BaseException as e:
+        pending.cancel()
+        pending.add_done_callback(give_back)
+        if isinstance(e, asyncio.TimeoutError):
+            raise wsgi.PoolTimeout("no connection available") from None
+        raise
+
+
+@asynccontextmanager
+async def db_cursor(cursor_cls=aiomysql.DictCursor, unlimited=False):
+    """*unlimited*: lift the statement timeout for this use, as app.db_cursor."""
+    conn = await acquire()
+    limit = wsgi.POOL.statement_timeout
+    lifted = unlimited and limit
+    try:
+        if lifted:
+            async with conn.cursor() as cur:
+                await cur.execute(timeout_sql(None))
+        async with conn.cursor(cursor_cls) as cur:
+            yield cur
+        if lifted:
+            async with conn.cursor() as cur:
+                await cur.execute(timeout_sql(limit))
+            lifted = False
+    finally:
+        if lifted:
+            conn.close()            # limit not restored: never reuse it
+        APOOL.release(conn)
+
+
+async def fetch_all(query, params=()):
+    async with db_cursor() as cur:
+        await cur.execute(query, params)
+        return await cur.fetchall()
+
+
+async def fetch_one(query, params=()):
+    async with db_cursor() as cur:
+        await cur.execute(query, params)
+        return await cur.fetchone()
+
+
+def bad(msg, code=400):
+    return JSONResponse({"error": msg}, code)
+
+
+def flask_json(body, code=200):
+    """*body* encoded by the Flask app's JSON provider – for payloads that
+    carry raw DATETIME values, so they render exactly as under app.py."""
+    return Response(wsgi.app.json.dumps(body), code, media_type="application/json")
+
+
+async def pool_timeout(request, exc):
+    return bad("Database busy, try again", 503)
+
+
+async def db_error(request, exc):
+    """Same mapping as app.db_error() for the async routes."""
+    if exc.args and exc.args[0] == 3024:
+        return bad("Query took too long", 504)
+    if exc.args and exc.args[0] == 1064 and request.query_params.get("content"):
+        return bad("content is not a valid full‑text search expression")
+    raise exc
+
+
+# ---------------------------------------------------------------
+#  Request helpers – async twins of the ones in app.py
+# ---------------------------------------------------------------
+def wants_stream(request):
+    return wsgi.negotiate_stream(request.query_params.get("stream"),
+                                 request.headers.get("accept"))
+
+
+async def ndjson_response(query, params, emit, group=None):
+    """
+    Stream *query* from an unbuffered server‑side cursor, see app.py.
+    emit() sees one batch at a time; with *group* (a column the rows
+    arrive grouped by) a batch's trailing group is held back until it
+    is complete, so emit() never gets half a group.
+    """
+    async def generate():
+        async with db_cursor(aiomysql.SSDictCursor, unlimited=True) as cur:
+            await cur.execute(query, params)
+            yield ""
+            held = []
+            while True:
+                rows = await cur.fetchmany(wsgi.STREAM_BATCH)
+                if not rows:
+                    rows, held = held, []
+                    if not rows:
+                        return
+                elif group:
+                    rows = held + rows
+                    cut = len(rows)
+                    while cut and rows[cut - 1][group] == rows[-1][group]:
+                        cut -= 1
+                    rows, held = rows[:cut], rows[cut:]
+                for item in emit(rows):
+                    yield json.dumps(item, default=str) + "\n"
+
+    body = generate()
+    await body.__anext__()          # execute now, before the status line
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+def conditional(endpoint, tags):
+    """ETag / If-None-Match as app.conditional(); *endpoint* is the Flask name."""
+    def deco(view):
+        async def wrapper(request):
+            deps = tags(request.query_params) if callable(tags) else list(tags)
+            versions = data_version.in_order(
+                deps, await fetch_all(*data_version.read_sql(deps))
+            )
+            etag = wsgi.etag_for(endpoint, request.query_params.multi_items(), deps,
+                                 versions, "ndjson" if wants_stream(request) else "json")
+            quoted = f'"{etag}"'
+            if quoted in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+                return Response(status_code=304, headers={"ETag": quoted, "Vary": "Accept"})
+            resp = await view(request)
+            if resp.status_code == 200:
+                resp.headers["ETag"] = quoted
+                resp.headers["Vary"] = "Accept"
+            return resp
+        return wrapper
+    return deco
+
+
+# ---------------------------------------------------------------
+#  Async read routes
+# ---------------------------------------------------------------
+@conditional("list_projects", ["projects"])
+async def list_projects(request):
+    rows = await fetch_all("SELECT id, name FROM Project ORDER BY name")
+    return JSONResponse({"projects": rows})
+
+
+@conditional("list_usernames", ["users"])
+async def list_usernames(request):
+    try:
+        limit, after = wsgi.page_args(kind="name", args=request.query_params)
+    except ValueError as e:
+        return bad(str(e))
+
+    if not limit:
+        rows = await fetch_all("SELECT DISTINCT username FROM `User`")
+        return JSONResponse({"usernames": [r["username"] for r in rows]})
+
+    rows = await fetch_all(
+        f"""
+        SELECT DISTINCT username FROM `User`
+        {"WHERE username > %s" if after is not None else ""}
+        ORDER BY username
+        LIMIT %s
+        """,
+        (*((after,) if after is not None else ()), limit + 1),
+    )
+    names = [r["username"] for r in rows]
+    more = len(names) > limit
+    names = names[:limit]
+    return JSONResponse({
+        "usernames": names,
+        "next_cursor": wsgi.encode_cursor(names[-1]) if more else None,
+    })
+
+
+@conditional("list_user_platforms", ["users", "posts"])
+async def list_user_platforms(request):
+    rows = await fetch_all(
+        """
+        SELECT DISTINCT s.name
+        FROM Post p
+        JOIN `User` u ON p.user_id = u.id
+        JOIN SocialMedia s ON p.social_media_id = s.id
+        WHERE u.username = %s
+        """,
+        (request.query_params.get("username"),),
+    )
+    return JSONResponse({"platforms": [r["name"] for r in rows]})
+
+
+@conditional("get_posts_in_range", ["posts", "users"])
+async def get_posts_in_range(request):
+    args = request.query_params
+    start, end = args.get("start"), args.get("end")
+    platform = args.get("social_media", "").strip() or None
+
+    if not start or not end or not wsgi.valid_datetime(start) or not wsgi.valid_datetime(end):
+        return JSONResponse({"posts": []}, 400)
+    lo, hi = wsgi.parse_range(start, end)
+
+    try:
+        limit, after = wsgi.page_args(args=args)
+    except ValueError as e:
+        return bad(str(e))
+    stream = wants_stream(request)
+    if stream:
+        limit = after = None
+
+    query, params = wsgi.posts_in_range_query(lo, hi, platform, after, limit)
+    if stream:
+        return await ndjson_response(query, params,
+                               lambda rows: map(wsgi.range_post_row, rows))
+
+    rows = await fetch_all(query, params)
+    if not limit:
+        return JSONResponse({"posts": [wsgi.range_post_row(r) for r in rows]})
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return JSONResponse({
+        "posts": [wsgi.range_post_row(r) for r in rows],
+        "next_cursor": wsgi.time_cursor(rows[-1]) if more else None,
+    })
+
+
+async def search_post(request):
+    args = request.query_params
+    try:
+        flt = PostFilter(args)
+    except FilterError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    content = flt.content
+    by_score = bool(content) and args.get("sort") == "relevance"
+
+    try:
+        limit, after = wsgi.page_args("score" if by_score else "time", args)
+    except ValueError as e:
+        return bad(str(e))
+    stream = wants_stream(request)
+    if stream:
+        limit = after = None
+
+    query, params = wsgi.search_query(flt, by_score, limit, after)
+    if stream:
+        return await ndjson_response(query, tuple(params), lambda rows: (
+            wsgi.search_stream_row(r, content) for r in rows
+        ))
+
+    rows = await fetch_all(query, tuple(params))
+    return JSONResponse(wsgi.search_body(rows, content, by_score, limit))
+
+
+@conditional("list_user_posts", ["posts", "users"])
+async def list_user_posts(request):
+    args = request.query_params
+    try:
+        limit, after = wsgi.page_args(args=args)
+    except ValueError as e:
+        return bad(str(e))
+    kind = args.get("type")
+    if kind not in (None, "original", "repost"):
+        return bad("type must be original or repost")
+
+    rows = await fetch_all(*wsgi.user_posts_query(args.get("username"), args.get("platform"),
+                                                  kind, after, limit))
+    return JSONResponse(wsgi.user_posts_body(rows, limit))
+
+
+@conditional("repost_cascade", ["posts"])
+async def repost_cascade(request):
+    try:
+        post_id, max_depth = wsgi.cascade_args(request.query_params)
+    except ValueError:
+        return bad("post_id and max_depth must be integers")
+
+    query, params = reposts.cascade_query(post_id, max_depth)
+    if wants_stream(request):
+        return await ndjson_response(query, params, lambda rows: map(reposts.edge_row, rows))
+
+    async with db_cursor() as cur:
+        await cur.execute(reposts.ROOT_SQL, (post_id,))
+        root = await cur.fetchone()
+        if not root:
+            return bad("Post not found", 404)
+        await cur.execute(query, params)
+        edges = await cur.fetchall()
+    return JSONResponse(wsgi.cascade_body(root, edges))
+
+
+@conditional("repost_cascade_metrics", ["posts"])
+async def repost_cascade_metrics(request):
+    try:
+        post_id, max_depth = wsgi.cascade_args(request.query_params)
+    except ValueError:
+        return bad("post_id and max_depth must be integers")
+
+    async with db_cursor() as cur:
+        await cur.execute(reposts.ROOT_SQL, (post_id,))
+        root = await cur.fetchone()
+        if not root:
+            return bad("Post not found", 404)
+        await cur.execute(*reposts.cascade_metrics_query(post_id, max_depth))
+        row = await cur.fetchone()
+    return JSONResponse({"post_id": post_id, "metrics": reposts.metrics_from_row(root, row)})
+
+
+@conditional("top_reposted", ["posts"])
+async def top_reposted(request):
+    try:
+        query = reposts.top_reposted_query(*wsgi.top_reposted_args(request.query_params))
+    except ValueError as e:
+        return bad(str(e))
+
+    rows = await fetch_all(*query)
+    return JSONResponse({"posts": [{**r, "post_time": wsgi.fmt_time(r["post_time"])}
+                                   for r in rows]})
+
+
+async def field_completion(cur, project_ids, post_ids=None):
+    """app.field_completion() on an async cursor."""
+    if not project_ids:
+        return {}
+    totals_q, fields_q = wsgi.field_completion_queries(project_ids, post_ids)
+    await cur.execute(*totals_q)
+    totals = await cur.fetchall()
+    await cur.execute(*fields_q)
+    return wsgi.field_completion_result(project_ids, totals, await cur.fetchall())
+
+
+@conditional("field_completion_route", ["project:*"])
+async def field_completion_route(request):
+    args = request.query_params
+    try:
+        pids, post_ids = wsgi.completion_args(args.getlist("project_id"), args)
+    except ValueError as e:
+        return bad(str(e))
+
+    async with db_cursor() as cur:
+        stats = await field_completion(cur, pids, post_ids or None)
+    return JSONResponse({"projects": stats})
+
+
+@conditional("query_project_analysis", wsgi.analysis_tags)
+async def query_project_analysis(request):
+    pid = request.query_params.get("project_id")
+    name = request.query_params.get("project_name")
+    if not pid and not name:
+        return bad("Provide project_id or project_name")
+    if pid and not pid.isdigit():
+        return bad("project_id must be an integer")
+
+    async with db_cursor() as cur:
+        if name and not pid:
+            await cur.execute("SELECT id FROM Project WHERE name=%s", (name,))
+            row = await cur.fetchone()
+            if not row:
+                return bad("Project not found", 404)
+            pid = row["id"]
+        await cur.execute(wsgi.ANALYSIS_SQL, (pid,))
+        posts = wsgi.analysis_posts(await cur.fetchall())
+        total_q, fields_q = project_stats.completion_queries(pid)
+        await cur.execute(*total_q)
+        total = await cur.fetchone()
+        await cur.execute(*fields_q)
+        completion = project_stats.completion_result(total, await cur.fetchall())
+    return flask_json({"posts": posts, "field_completion": wsgi.completion_pcts(completion)})
+
+
+async def combo_post_to_experiment(request):
+    try:
+        flt = PostFilter(request.query_params)
+    except FilterError as e:
+        return bad(str(e))
+    params = tuple(flt.params())
+
+    if wants_stream(request):
+        return await ndjson_response(combo_stream_sql(flt.shape), params,
+                                     wsgi.combo_stream_items, group="project_post_id")
+
+    async with db_cursor() as cur:
+        await cur.execute(combo_posts_sql(flt.shape), params)
+        posts = await cur.fetchall()
+        if not posts:
+            return JSONResponse({"experiments": {}})
+        post_ids = [p["id"] for p in posts]
+        await cur.execute(*wsgi.combo_results_query(post_ids))
+        rows = await cur.fetchall()
+        exp_ids = {r["project_name"]: r["project_id"] for r in rows}
+        completion = await field_completion(cur, list(exp_ids.values()), post_ids)
+    return flask_json(wsgi.combo_body(posts, rows, exp_ids, completion))
+
+
+app = Starlette(
+    routes=[
+        Route("/list_projects", list_projects),
+        Route("/list_usernames", list_usernames),
+        Route("/list_user_platforms", list_user_platforms),
+        Route("/get_posts_in_range", get_posts_in_range),
+        Route("/search_post", search_post),
+        Route("/list_user_posts", list_user_posts),
+        Route("/repost_cascade", repost_cascade),
+        Route("/repost_cascade_metrics", repost_cascade_metrics),
+        Route("/top_reposted", top_reposted),
+        Route("/field_completion", field_completion_route),
+        Route("/query_project_analysis", query_project_analysis),
+        Route("/combo_post_to_experiment", combo_post_to_experiment),
+        Mount("/", WSGIMiddleware(wsgi.app)),     # writes, export, jobs, stats
+    ],
+    exception_handlers={wsgi.PoolTimeout: pool_timeout, aiomysql.MySQLError: db_error},
+    lifespan=lifespan,
+)
@@ -0,0 +1,262 @@
+# ================================================================
+#  bulk_import.py  –  batched Post ingestion (used by /import_posts
+#                     and `manage.py import-posts`)
+# ================================================================
+import json
+from datetime import datetime
+from itertools import islice
+
+import data_version
+from dim_cache import DIMS
+
+
+def parse_ndjson(lines):
+    """Yield (line_no, record_or_None, error_or_None) for each non‑blank line."""
+    for n, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        yield n, rec, None
+
+
+# Column limits from init_db.sql.  Rows are checked against them up
+# front: INSERT IGNORE would truncate an over‑long value and turn a
+# failed CHECK into a warning instead of reporting the record.
+MAX_CHARS = {                   # VARCHAR(n) – characters
+    "username": 40, "social_media": 50,
+    "first_name": 50, "last_name": 50,
+    "birth_country": 50, "residence_country": 50,
+    "city": 100, "state": 100, "country": 100,
+}
+MAX_BYTES = {"content": 65535, "media_url": 65535}     # TEXT – bytes
+MAX_INT = 2**31 - 1
+GENDERS = ("male", "female", "non_binary", "other")
+
+
+def _check(rec):
+    """Return an error string, or None if *rec* can be imported."""
+    if not isinstance(rec, dict):
+        return "record must be an object"
+    for k in ("username", "social_media", "post_time", "content"):
+        if not rec.get(k):
+            return f"missing {k}"
+        if not isinstance(rec[k], str):
+            return f"{k} must be a string"
+    for k, n in MAX_CHARS.items():
+        v = rec.get(k)
+        if v is not None and (not isinstance(v, str) or len(v) > n):
+            return f"{k} must be a string of at most {n} characters"
+    for k, n in MAX_BYTES.items():
+        v = rec.get(k)
+        if v is not None and (not isinstance(v, str) or len(v.encode()) > n):
+            return f"{k} must be a string of at most {n} bytes"
+    t = str(rec["post_time"]).strip()
+    try:
+        when = datetime.strptime(t, "%Y-%m-%d %H:%M:%S" if " " in t else "%Y-%m-%d")
+    except ValueError:
+        return "post_time must be YYYY‑MM‑DD HH:MM:SS"
+    if when.year < 1000:
+        return "post_time must be in year 1000 or later"
+    for k in ("likes", "dislikes", "age"):
+        v = rec.get(k)
+        if v is None:
+            continue
+        try:
+            if isinstance(v, bool) or not 0 <= int(v) <= MAX_INT:
+                return f"{k} must be an integer from 0 to {MAX_INT}"
+        except (TypeError, ValueError):
+            return f"{k} must be an integer"
+    if rec.get("gender") is not None and rec["gender"] not in GENDERS:
+        return f"gender must be one of {', '.join(GENDERS)}"
+    return None
+
+
+class DimensionResolver:
+    """
+    Name → id cache for SocialMedia and User rows, filled with one batched
+    SELECT (plus one multi‑row INSERT IGNORE for the misses) per chunk.
+    Keys are lower‑cased to match MySQL's case‑insensitive collation.
+    Hits in the process‑wide dim_cache.DIMS skip the database; ids looked
+    up here are published to it by publish() once their chunk committed.
+    """
+
+    def __init__(self):
+        self.platforms = {}          # name.lower() -> id
+        self.users = {}              # (media_id, username.lower()) -> id
+        self._fresh = []             # (DIMS key, id) not yet published
+
+    def clear(self):
+        self.platforms.clear()
+        self.users.clear()
+        self._fresh.clear()
+
+    def publish(self):
+        for key, id_ in self._fresh:
+            DIMS.put(key, id_)
+        self._fresh.clear()
+
+    def resolve_platforms(self, cur, names):
+        missing = {}                 # name.lower() -> name as first seen
+        for n in names:
+            k = n.lower()
+            if k in self.platforms or k in missing:
+                continue
+            hit = DIMS.get(("platform", k))
+            if hit:
+                self.platforms[k] = hit
+            else:
+                missing[k] = n
+        missing = sorted(missing.values())
+        if not missing:
+            return
+        placeholders = ",".join(["%s"] * len(missing))
+        cur.execute(
+            "INSERT IGNORE INTO SocialMedia (name) VALUES "
+            + ",".join(["(%s)"] * len(missing)),
+            tuple(missing),
+        )
+        cur.execute(
+            f"SELECT id, name FROM SocialMedia WHERE name IN ({placeholders})",
+            tuple(missing),
+        )
+        for r in cur.fetchall():
+            self.platforms[r["name"].lower()] = r["id"]
+            self._fresh.append((("platform", r["name"].lower()), r["id"]))
+
+    def resolve_users(self, cur, recs):
+        """*recs*: records whose platform is already resolved."""
+        wanted = {}
+        for rec in recs:
+            media_id = self.platforms[rec["social_media"].lower()]
+            key = (media_id, rec["username"].lower())
+            if key in self.users or key in wanted:
+                continue
+            hit = DIMS.get(("user", *key))
+            if hit:
+                self.users[key] = hit
+            else:
+                wanted[key] = rec
+
+        by_media = {}
+        for (media_id, _), rec in wanted.items():
+            by_media.setdefault(media_id, []).append(rec)
+
+        for media_id, group in by_media.items():
+            rows = [
+                (r["username"], media_id, r.get("first_name"), r.get("last_name"),
+                 r.get("birth_country"), r.get("residence_country"), r.get("age"),
+                 r.get("gender"), bool(r.get("verified", False)))
+                for r in group
+            ]
+            # a no‑op update skips rows on a UNIQUE key only; anything
+            # else _check() let through fails loudly instead of as a warning
+            cur.execute(
+                """
+                INSERT INTO `User`
+                  (username, social_media_id, first_name, last_name,
+                   country_of_birth, country_of_residence, age, gender, verified)
+                VALUES """ + ",".join(["(%s,%s,%s,%s,%s,%s,%s,%s,%s)"] * len(rows))
+                + " ON DUPLICATE KEY UPDATE id = id",
+                tuple(v for row in rows for v in row),
+            )
+            names = [r["username"] for r in group]
+            cur.execute(
+                f"SELECT id, username FROM `User` WHERE social_media_id=%s "
+                f"AND username IN ({','.join(['%s'] * len(names))})",
+                (media_id, *names),
+            )
+            for r in cur.fetchall():
+                key = (media_id, r["username"].lower())
+                self.users[key] = r["id"]
+                self._fresh.append((("user", *key), r["id"]))
+
+    def user_id(self, rec):
+        """(media_id, user_id); user_id is None if the user could not be
+        created (the insert hit UNIQUE(first_name, last_name, …))."""
+        media_id = self.platforms[rec["social_media"].lower()]
+        return media_id, self.users.get((media_id, rec["username"].lower()))
+
+
+def import_posts(conn, cur, records, chunk_size=5000, resolver=None, progress=None):
+    """
+    Import an iterable of (ref, record, parse_error) triples – see
+    parse_ndjson() – committing every *chunk_size* records.  Duplicates
+    on UNIQUE(user_id, social_media_id, post_time) are skipped by a no‑op
+    ON DUPLICATE KEY UPDATE, which reports 0 affected rows for them, so
+    "duplicates" counts exactly those.  Returns a summary with
+    per‑record errors keyed by ref.
+    *progress(summary)*, if given, is called after every committed chunk.
+    """
+    resolver = resolver or DimensionResolver()
+    summary = {"received": 0, "inserted": 0, "duplicates": 0, "errors": []}
+    it = iter(records)
+
+    while True:
+        batch = list(islice(it, chunk_size))
+        if not batch:
+            break
+        summary["received"] += len(batch)
+
+        good = []
+        for ref, rec, err in batch:
+            err = err or _check(rec)
+            if err:
+                summary["errors"].append({"ref": ref, "error": err})
+            else:
+                good.append((ref, rec))
+        if not good:
+            continue
+
+        try:
+            resolver.resolve_platforms(cur, [r["social_media"] for _, r in good])
+            resolver.resolve_users(cur, [r for _, r in good])
+
+            rows = []
+            for ref, r in good:
+                media_id, user_id = resolver.user_id(r)
+                if user_id is None:
+                    summary["errors"].append({
+                        "ref": ref,
+                        "error": "user could not be created: another account on "
+                                 "this platform has the same first and last name",
+                    })
+                    continue
+                rows.append((
+                    user_id, media_id, str(r["post_time"]).strip(), r["content"],
+                    r.get("city"), r.get("state"), r.get("country"),
+                    int(r.get("likes", 0)), int(r.get("dislikes", 0)),
+                    bool(r.get("multimedia", False)), r.get("media_url"),
+                ))
+            inserted = 0
+            if rows:
+                cur.execute(
+                    """
+                    INSERT INTO Post
+                      (user_id, social_media_id, post_time, content, city, state,
+                       country, likes, dislikes, multimedia, media_url)
+                    VALUES """ + ",".join(["(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"] * len(rows))
+                    + " ON DUPLICATE KEY UPDATE id = id",
+                    tuple(v for row in rows for v in row),
+                )
+                inserted = cur.rowcount
+            conn.commit()
+            resolver.publish()
+            data_version.bump_committed(conn, cur, "posts", "users")
+        except Exception:
+            # ids created by the failed chunk were rolled back with it
+            resolver.clear()
+            raise
+
+        summary["inserted"] += inserted
+        summary["duplicates"] += len(rows) - inserted
+        if progress:
+            progress(summary)
+
+    return summary
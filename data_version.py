@@ -0,0 +1,51 @@
+# ================================================================
+#  data_version.py  –  per‑tag change counters behind the ETags
+#
+#  Tags are the same names the response cache uses ("posts", "users",
+#  "projects", "project:<id>", "project:*").  Writers bump them in a
+#  short transaction of their own right after the data commit: a reader
+#  between the two may see new data under the old version (harmless –
+#  the next bump retires it), never old data under a new one.  Bumping
+#  inside the write would hold the row lock of a hot tag like "posts"
+#  until the commit, serialising every writer on it.
+# ================================================================
+
+
+def bump(cur, *tags):
+    """Increment *tags* (creating missing rows) in the caller's transaction."""
+    tags = sorted(set(tags))                 # fixed lock order across writers
+    if not tags:
+        return
+    cur.execute(
+        "INSERT INTO DataVersion (tag, version) VALUES "
+        + ",".join(["(%s, 1)"] * len(tags))
+        + " ON DUPLICATE KEY UPDATE version = version + 1",
+        tuple(tags),
+    )
+
+
+def bump_committed(conn, cur, *tags):
+    """bump() in its own transaction; call after the data is committed."""
+    bump(cur, *tags)
+    conn.commit()
+
+
+def read_sql(tags):
+    return (
+        f"SELECT tag, version FROM DataVersion "
+        f"WHERE tag IN ({','.join(['%s'] * len(tags))})",
+        tuple(tags),
+    )
+
+
+def in_order(tags, rows):
+    found = {r["tag"]: r["version"] for r in rows}
+    return [found.get(t, 0) for t in tags]
+
+
+def read(cur, tags):
+    """Current version of each tag, in the order given (0 if never bumped)."""
+    if not tags:
+        return []
+    cur.execute(*read_sql(tags))
+    return in_order(tags, cur.fetchall())
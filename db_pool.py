@@ -0,0 +1,212 @@
+# ================================================================
+#  db_pool.py  –  fixed-size + overflow MySQL connection pool
+# ================================================================
+import threading, time
+from collections import deque
+
+import mysql.connector
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the pool's wait timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived mysql.connector connections.
+
+      size          connections kept open while idle
+      max_overflow  extra connections opened under load, closed on release
+      timeout       seconds a checkout waits before raising PoolTimeout
+      recycle       seconds after which a connection is reopened
+      pre_ping      ping idle connections on checkout (health check)
+      statement_timeout
+                    seconds a SELECT may run before MySQL aborts it
+                    (session max_execution_time); None = no limit
+
+    Connections are opened lazily, so creating the pool never touches the
+    server (safe to build at import time and before a fork).
+    """
+
+    def __init__(self, db_cfg, size=5, max_overflow=10, timeout=5.0,
+                 recycle=1800, pre_ping=True, statement_timeout=None):
+        self.db_cfg = dict(db_cfg)
+        self.size = int(size)
+        self.max_overflow = int(max_overflow)
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.pre_ping = bool(pre_ping)
+        self.statement_timeout = statement_timeout
+
+        self._idle = deque()                 # (conn, opened_at)
+        self._opened_at = {}                 # id(conn) -> opened_at
+        self._open = 0                       # idle + in use
+        self._unlimited = set()              # id(conn) with the limit lifted
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._broken = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -----------------------------------------------------------
+    #  checkout / return
+    # -----------------------------------------------------------
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, opened_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    conn, opened_at = None, None
+                    self._open += 1
+                    break
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._waits += 1
+                    raise PoolTimeout(
+                        f"no database connection free after {self.timeout:g}s"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._checkout(conn, opened_at)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._waits += waited
+            self._wait_total += elapsed
+            self._wait_max = max(self._wait_max, elapsed)
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return *conn* to the pool, resetting any open transaction."""
+        if not discard:
+            try:
+                conn.consume_results()
+                conn.rollback()
+                if id(conn) in self._unlimited:
+                    self._set_timeout(conn, self.statement_timeout)
+            except Exception:
+                discard = True
+        self._unlimited.discard(id(conn))
+
+        with self._cond:
+            opened_at = self._opened_at.get(id(conn))
+            if discard or opened_at is None or len(self._idle) >= self.size:
+                self._close(conn)
+                self._open -= 1
+            else:
+                self._idle.append((conn, opened_at))
+            self._cond.notify()
+
+    def _checkout(self, conn, opened_at):
+        if conn is not None:
+            if time.monotonic() - opened_at > self.recycle:
+                self._recycled += 1
+                self._close(conn)
+                conn = None
+            elif self.pre_ping and not self._healthy(conn):
+                self._broken += 1
+                self._close(conn)
+                conn = None
+        if conn is None:
+            conn = mysql.connector.connect(**self.db_cfg)
+            if self.statement_timeout:
+                self._set_timeout(conn, self.statement_timeout)
+            with self._cond:
+                self._opened_at[id(conn)] = time.monotonic()
+        return conn
+
+    @staticmethod
+    def _set_timeout(conn, seconds):
+        cur = conn.cursor()
+        try:
+            cur.execute("SET SESSION max_execution_time = %s",
+                        (int(seconds * 1000) if seconds else 0,))
+        finally:
+            cur.close()
+
+    def lift_timeout(self, conn):
+        """
+        No statement_timeout for *conn* until it is released – for
+        streams and background jobs that legitimately run long.
+        """
+        if self.statement_timeout:
+            self._set_timeout(conn, None)
+            self._unlimited.add(id(conn))
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        self._opened_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # -----------------------------------------------------------
+    #  lifecycle
+    # -----------------------------------------------------------
+    def dispose(self):
+        """Close every idle connection (in-use ones close on release)."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+                self._open -= 1
+
+    def reset_after_fork(self):
+        """
+        Forget connections inherited from a parent process without
+        closing them – a COM_QUIT from the child would kill the parent's
+        session on the shared socket.
+        """
+        self._idle = deque()
+        self._opened_at = {}
+        self._open = 0
+        self._unlimited = set()
+        self._cond = threading.Condition()
+
+    # -----------------------------------------------------------
+    #  metrics
+    # -----------------------------------------------------------
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": idle,
+                "in_use": self._open - idle,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "broken": self._broken,
+                "checkout_ms_avg": round(
+                    self._wait_total / self._checkouts * 1000, 3
+                ) if self._checkouts else 0.0,
+                "checkout_ms_max": round(self._wait_max * 1000, 3),
+            }
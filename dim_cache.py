@@ -0,0 +1,193 @@
+# ================================================================
+#  dim_cache.py  –  process‑wide name → id cache for the dimension
+#                   tables (SocialMedia, User, ProjectField, Institute)
+#
+#  Rows in these tables are never renamed or deleted by the API, so an
+#  id, once committed, stays valid.  Ids created inside a transaction
+#  are held as *pending* for their connection and only published after
+#  that transaction commits – a rolled‑back INSERT never leaks an id.
+#  Deleting dimension rows by hand requires a restart (or DIMS.clear()).
+# ================================================================
+import threading, weakref
+from collections import OrderedDict
+
+import mysql.connector
+
+
+class DimCache:
+    """Bounded LRU shared by every request thread of this process."""
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()           # (kind, *folded key) -> id
+        self._pending = weakref.WeakKeyDictionary()   # conn -> {key: id}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return hit
+
+    def put(self, key, id_):
+        with self._lock:
+            self._data[key] = id_
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def put_pending(self, conn, key, id_):
+        with self._lock:
+            self._pending.setdefault(conn, {})[key] = id_
+
+    def get_pending(self, conn, key):
+        with self._lock:
+            return self._pending.get(conn, {}).get(key)
+
+    def committed(self, conn):
+        """Publish ids created by *conn*'s transaction that just committed."""
+        with self._lock:
+            fresh = self._pending.pop(conn, {})
+        for key, id_ in fresh.items():
+            self.put(key, id_)
+
+    def rolled_back(self, conn):
+        with self._lock:
+            self._pending.pop(conn, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._pending.clear()
+
+    def stats(self):
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+DIMS = DimCache()
+
+
+class DimensionError(ValueError):
+    """A dimension key that can never name a row (bad id or name)."""
+
+
+def _fold(*parts):
+    # MySQL compares names case‑insensitively (utf8mb4_0900_ai_ci)
+    return tuple(p.lower() if isinstance(p, str) else p for p in parts)
+
+
+def get_or_create(conn, cur, key, select, select_args, insert, insert_args):
+    """
+    Id for *key* from the cache, else SELECT, else INSERT.  A concurrent
+    request that inserts the same row first makes our INSERT fail with
+    ER_DUP_ENTRY; the winner's row is then read with a locking read,
+    which sees it even under REPEATABLE READ.
+    """
+    id_ = DIMS.get(key) or DIMS.get_pending(conn, key)
+    if id_:
+        return id_
+
+    cur.execute(select, select_args)
+    row = cur.fetchone()
+    if row:
+        DIMS.put(key, row["id"])
+        return row["id"]
+
+    try:
+        cur.execute(insert, insert_args)
+    except mysql.connector.IntegrityError as e:
+        if e.errno != 1062:
+            raise
+        cur.execute(select + " LOCK IN SHARE MODE", select_args)
+        row = cur.fetchone()
+        if not row:                  # clashed on some other UNIQUE key
+            raise
+        DIMS.put(key, row["id"])
+        return row["id"]
+    DIMS.put_pending(conn, key, cur.lastrowid)
+    return cur.lastrowid
+
+
+# ---------------------------------------------------------------
+#  One helper per dimension
+# ---------------------------------------------------------------
+def platform_id(conn, cur, name):
+    return get_or_create(
+        conn, cur, ("platform", *_fold(name)),
+        "SELECT id FROM SocialMedia WHERE name=%s", (name,),
+        "INSERT INTO SocialMedia (name) VALUES (%s)", (name,),
+    )
+
+
+def user_id(conn, cur, username, media_id, profile=None):
+    """*profile*: optional dict of the extra `User` columns for a new user."""
+    p = profile or {}
+    return get_or_create(
+        conn, cur, ("user", *_fold(media_id, username)),
+        "SELECT id FROM `User` WHERE username=%s AND social_media_id=%s",
+        (username, media_id),
+        """
+        INSERT INTO `User`
+          (username, social_media_id, first_name, last_name,
+           country_of_birth, country_of_residence, age, gender, verified)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """,
+        (username, media_id, p.get("first_name"), p.get("last_name"),
+         p.get("birth_country"), p.get("residence_country"), p.get("age"),
+         p.get("gender"), p.get("verified", False)),
+    )
+
+
+def field_id(conn, cur, project_id, name):
+    if isinstance(project_id, bool) or not isinstance(project_id, int):
+        try:
+            project_id = int(project_id)
+        except (TypeError, ValueError):
+            raise DimensionError("project_id must be an integer") from None
+    if not isinstance(name, str) or not name.strip() or len(name) > 100:
+        raise DimensionError("field name must be 1–100 characters")
+    return get_or_create(
+        conn, cur, ("field", *_fold(project_id, name)),
+        "SELECT id FROM ProjectField WHERE name=%s AND project_id=%s",
+        (name, project_id),
+        "INSERT INTO ProjectField (name, project_id) VALUES (%s, %s)",
+        (name, project_id),
+    )
+
+
+def institute_id(conn, cur, name):
+    return get_or_create(
+        conn, cur, ("institute", *_fold(name)),
+        "SELECT id FROM Institute WHERE name=%s", (name,),
+        "INSERT INTO Institute (name) VALUES (%s)", (name,),
+    )
+
+
+def find_users(conn, cur, media_id, usernames):
+    """
+    {username.lower(): id} for the *usernames* that exist on *media_id*;
+    never creates users.  Misses are looked up with one IN (...) query.
+    """
+    out, missing = {}, []
+    for name in {u.lower(): u for u in usernames}.values():
+        key = ("user", *_fold(media_id, name))
+        id_ = DIMS.get(key) or DIMS.get_pending(conn, key)
+        if id_:
+            out[name.lower()] = id_
+        else:
+            missing.append(name)
+    if missing:
+        cur.execute(
+            f"SELECT id, username FROM `User` WHERE social_media_id=%s "
+            f"AND username IN ({','.join(['%s'] * len(missing))})",
+            (media_id, *missing),
+        )
+        for r in cur.fetchall():
+            DIMS.put(("user", *_fold(media_id, r["username"])), r["id"])
+            out[r["username"].lower()] = r["id"]
+    return out
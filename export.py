@@ -0,0 +1,169 @@
+# ================================================================
+#  export.py  –  columnar export of a project's analysis results
+#                (/export_project and `manage.py export-project`)
+#
+#  One row per project post: the post's metadata plus one string
+#  column per ProjectField, NULL where no result was entered.  Rows are
+#  read from an unbuffered cursor ordered by post id, pivoted in Python
+#  and written as Arrow record batches of EXPORT_BATCH rows, so memory
+#  stays at one batch whatever the size of the project.
+#
+#    format "arrow"    Arrow IPC stream (pyarrow.ipc.open_stream)
+#    format "parquet"  Parquet, one row group per batch
+#
+#  Needs:  pip install pyarrow
+# ================================================================
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:         # the rest of the API works without it
+    pa = pq = None
+
+EXPORT_BATCH = 50_000   # posts per record batch / Parquet row group
+FETCH_ROWS = 5_000      # rows pulled from the server per fetchmany()
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+META = ("post_id", "post_time", "social_media", "username", "content")
+
+
+def require():
+    if pa is None:
+        raise RuntimeError("export needs `pip install pyarrow`")
+
+
+def project_fields(cur, pid):
+    """[(field_id, column_name)] in field id order."""
+    cur.execute("SELECT id, name FROM ProjectField WHERE project_id = %s ORDER BY id",
+                (pid,))
+    # a field called like a metadata column must not shadow it
+    return [(r["id"], f"field_{r['name']}" if r["name"] in META else r["name"])
+            for r in cur.fetchall()]
+
+
+def schema(fields):
+    return pa.schema(
+        [("post_id", pa.int64()), ("post_time", pa.timestamp("s")),
+         ("social_media", pa.string()), ("username", pa.string()),
+         ("content", pa.string())]
+        + [(name, pa.string()) for _, name in fields]
+    )
+
+
+def record_batches(cur, pid, fields, batch_rows=EXPORT_BATCH):
+    """
+    Yield the project's wide table as RecordBatches.  *cur* must be an
+    unbuffered dictionary cursor; its result set is consumed here.
+    """
+    sch = schema(fields)
+    col_of = {fid: i for i, (fid, _) in enumerate(fields)}
+    cur.execute(
+        """
+        SELECT p.id, p.post_time, sm.name AS social_media, u.username,
+               p.content, ar.field_id, ar.value
+        FROM ProjectPost pp
+        JOIN Post p             ON pp.post_id = p.id
+        JOIN `User`       u     ON p.user_id  = u.id
+        JOIN SocialMedia sm     ON p.social_media_id = sm.id
+        LEFT JOIN AnalysisResult ar ON ar.project_post_id = pp.id
+        WHERE pp.project_id = %s
+        ORDER BY pp.post_id
+        """,
+        (pid,),
+    )
+
+    def empty():
+        return [[] for _ in range(len(META) + len(fields))]
+
+    def flush(cols):
+        return pa.RecordBatch.from_arrays(
+            [pa.array(c, type=f.type) for c, f in zip(cols, sch)], schema=sch
+        )
+
+    cols, last = empty(), None
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        for row in rows:
+            if row["id"] != last:
+                if len(cols[0]) == batch_rows:
+                    yield flush(cols)
+                    cols = empty()
+                last = row["id"]
+                for i, key in enumerate(("id", "post_time", "social_media",
+                                         "username", "content")):
+                    cols[i].append(row[key])
+                for c in cols[len(META):]:
+                    c.append(None)
+            i = col_of.get(row["field_id"])
+            if i is not None:
+                cols[len(META) + i][-1] = row["value"]
+    if cols[0] or last is None:
+        yield flush(cols)           # an empty project still gets its schema
+
+
+def open_writer(sink, fmt, sch):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, sch, compression="zstd")
+    return pa.ipc.new_stream(sink, sch)
+
+
+class ChunkSink:
+    """Write‑only file object whose bytes are drained after each batch."""
+
+    def __init__(self):
+        self._parts, self._pos = [], 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def stream(cur, pid, fmt, batch_rows=EXPORT_BATCH):
+    """Yield the encoded export as byte chunks, one per record batch."""
+    require()
+    fields = project_fields(cur, pid)
+    sch = schema(fields)
+    sink = ChunkSink()
+    writer = open_writer(pa.PythonFile(sink, mode="w"), fmt, sch)
+    for batch in record_batches(cur, pid, fields, batch_rows):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def write_file(cur, pid, fmt, path, batch_rows=EXPORT_BATCH):
+    """Export to *path*; returns the number of rows written."""
+    require()
+    fields = project_fields(cur, pid)
+    sch = schema(fields)
+    rows = 0
+    with open_writer(path, fmt, sch) as writer:
+        for batch in record_batches(cur, pid, fields, batch_rows):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def filename(pid, fmt):
+    return f"project_{pid}_{datetime.now():%Y%m%d_%H%M%S}.{FORMATS[fmt][1]}"
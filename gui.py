@@ -72,8 +72,10 @@ def post(endpoint: str, payload: dict, ok="Success"):
         r.raise_for_status()
        # messagebox.showinfo("✓", r.json().get("status", ok))\
         toast(r.json().get("status", ok))
+        return r.json()
     except Exception as e:
         messagebox.showerror("Error", str(e))
+        return None
 
 
 def get(endpoint: str, params=None):
@@ -493,6 +495,27 @@ ttk.Checkbutton(
     command=toggle_all
 ).pack(anchor="w", pady=(0, 5))
 
+# project_id -> (etag, payload) of the last /query_project_analysis reply
+_analysis_cache = {}
+
+def get_project_analysis(pid):
+    """GET /query_project_analysis, revalidating the last copy by ETag."""
+    etag, data = _analysis_cache.get(pid, (None, None))
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        r = requests.get(f"{API_URL}/query_project_analysis",
+                         params={"project_id": pid}, headers=headers, timeout=8)
+        if r.status_code == 304:
+            return data
+        r.raise_for_status()
+        data = r.json()
+        if r.headers.get("ETag"):
+            _analysis_cache[pid] = (r.headers["ETag"], data)
+        return data
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
+        return None
+
 def load_posts_for_project(*args):
     for cb in posts_checkbox_frame.winfo_children():
         cb.destroy()
@@ -502,7 +525,7 @@ def load_posts_for_project(*args):
     if not pid.isdigit():
         return
 
-    data = get("/query_project_analysis", {"project_id": int(pid)})
+    data = get_project_analysis(int(pid))
     if not data: return
 
     ttk.Checkbutton(
@@ -596,25 +619,33 @@ def save_results():
     for k_var, v_var in pair_vars:
         key = k_var.get().strip()
         value = v_var.get().strip()
-        if key:
-            if key in seen_keys:
-                return messagebox.showerror("Duplicate Key", f"Field '{key}' is entered more than once.")
+        if not key:
+            continue
+        if key in seen_keys:
+            return messagebox.showerror("Duplicate Key", f"Field '{key}' is entered more than once.")
         results[key] = value
         seen_keys.add(key)
 
     if not results:
         return messagebox.showerror("Missing", "Enter at least one (field, value)")
     
-    for post_id in selected_post_ids:
-        payload = {
-            "project_id": project_id,
-            "post_id": post_id,
-            "results": results
-        }
-        post("/enter_analysis_result", payload)
-
-    # Show success as dialog box
-    messagebox.showinfo("Saved", f"Saved results for {len(selected_post_ids)} post(s).")
+    payload = {
+        "project_id": project_id,
+        "records": [{"post_id": pid, "results": results} for pid in selected_post_ids]
+    }
+    resp = post("/enter_analysis_results", payload)
+    if resp is None:
+        return                      # post() already showed the error
+
+    # Show the outcome as dialog box
+    if resp.get("errors"):
+        return messagebox.showwarning(
+            "Partly saved",
+            f"Saved results for {resp.get('posts_saved', 0)} post(s); "
+            f"{len(resp['errors'])} record(s) failed:\n"
+            + "\n".join(f"post {e.get('post_id', '?')}: {e['error']}" for e in resp["errors"][:10]),
+        )
+    messagebox.showinfo("Saved", f"Saved results for {resp.get('posts_saved', 0)} post(s).")
     if not messagebox.askyesno("Confirm", "Do you want to clear the form now?"):
         return
 
@@ -740,7 +771,7 @@ def load_exp():
             (p["content"][:45]+"…") if len(p["content"])>45 else p["content"],
             json.dumps(p.get("results",{}), ensure_ascii=False)[:120]
         ))
-    pct_text = "\n".join(f"{k}: {v}" for k,v in data["field_completion"].items())
+    pct_text = "\n".join(f"{k}: {v:.2f}%" for k,v in data["field_completion"].items())
     messagebox.showinfo("Field coverage", pct_text or "No fields yet")
 
 
@@ -790,7 +821,7 @@ def run_combo():
                 combo_tree.insert("", "end", values=(
                     exp, pst["id"], fld,
                     (str(val)[:60]+"…") if len(str(val))>60 else val,
-                    pct.get(fld,"")
+                    f"{pct[fld]:.1f}%" if fld in pct else ""
                 ))
 
 
@@ -1,6 +1,10 @@
 -- init_db_modified.sql
 
 SET FOREIGN_KEY_CHECKS = 0;
+DROP TABLE IF EXISTS Job;
+DROP TABLE IF EXISTS DataVersion;
+DROP TABLE IF EXISTS ProjectFieldStats;
+DROP TABLE IF EXISTS ProjectStats;
 DROP TABLE IF EXISTS AnalysisResult;
 DROP TABLE IF EXISTS ProjectField;
 DROP TABLE IF EXISTS ProjectPost;
@@ -39,8 +43,11 @@ CREATE TABLE `User` (
   age                  INT,
   gender               ENUM('male','female','non_binary','other') DEFAULT NULL,
   verified             BOOLEAN     DEFAULT FALSE,
+  first_name_norm      VARCHAR(50) AS (LOWER(TRIM(first_name))) VIRTUAL,
+  last_name_norm       VARCHAR(50) AS (LOWER(TRIM(last_name)))  VIRTUAL,
   
   UNIQUE (first_name, last_name, social_media_id),
+  UNIQUE (username, social_media_id),
   FOREIGN KEY (social_media_id) REFERENCES SocialMedia(id)
 
 );
@@ -59,11 +66,16 @@ CREATE TABLE Post (
   dislikes         INT  DEFAULT 0   CHECK (dislikes >= 0),
   multimedia       BOOLEAN DEFAULT FALSE,
   media_url        TEXT,
+  is_repost        BOOLEAN NOT NULL DEFAULT FALSE,   -- kept by /repost
+  repost_count     INT     NOT NULL DEFAULT 0,       -- direct reposts
+  root_post_id     INT,                              -- cascade root (reposts only)
   UNIQUE(user_id, social_media_id, post_time),
   FOREIGN KEY (user_id)         REFERENCES `User`(id),
   FOREIGN KEY (social_media_id) REFERENCES SocialMedia(id)
 );
 CREATE INDEX idx_social_time ON Post(social_media_id, post_time);
+CREATE INDEX idx_post_time   ON Post(post_time);
+CREATE FULLTEXT INDEX ft_post_content ON Post(content);
 
 -- 5. Reposts (now links both the original post row *and* the new repost post row)
 CREATE TABLE Repost (
@@ -77,6 +89,8 @@ CREATE TABLE Repost (
   FOREIGN KEY (repost_post_id)   REFERENCES Post(id),
   FOREIGN KEY (reposter_id)      REFERENCES `User`(id)
 );
+CREATE INDEX idx_repost_time ON Repost(repost_time, original_post_id);
+CREATE INDEX idx_repost_post ON Repost(repost_post_id);
 
 -- 6. Projects
 CREATE TABLE Project (
@@ -125,3 +139,47 @@ CREATE TABLE AnalysisResult (
 CREATE INDEX idx_user_social ON `User`(username, social_media_id);
 CREATE INDEX idx_pp_project  ON ProjectPost(project_id);
 CREATE INDEX idx_pp_post     ON ProjectPost(post_id);
+CREATE INDEX idx_user_first  ON `User`(first_name_norm);
+CREATE INDEX idx_user_last   ON `User`(last_name_norm);
+
+-- 11. Materialised completion counters (kept in step by the API,
+--     reconciled with `python manage.py stats verify|rebuild`)
+CREATE TABLE ProjectStats (
+  project_id  INT PRIMARY KEY,
+  post_count  INT NOT NULL DEFAULT 0,
+  FOREIGN KEY (project_id) REFERENCES Project(id)
+);
+
+CREATE TABLE ProjectFieldStats (
+  field_id    INT PRIMARY KEY,
+  project_id  INT NOT NULL,
+  filled      INT NOT NULL DEFAULT 0,
+  FOREIGN KEY (field_id)   REFERENCES ProjectField(id),
+  FOREIGN KEY (project_id) REFERENCES Project(id)
+);
+CREATE INDEX idx_pfs_project ON ProjectFieldStats(project_id);
+
+-- 12. Change counters behind the API's ETags (data_version.py)
+CREATE TABLE DataVersion (
+  tag      VARCHAR(64)     PRIMARY KEY,
+  version  BIGINT UNSIGNED NOT NULL DEFAULT 0
+);
+
+-- 13. Background jobs (jobs.py) – state, progress and results
+CREATE TABLE Job (
+  id                CHAR(32)     PRIMARY KEY,
+  kind              VARCHAR(50)  NOT NULL,
+  state             ENUM('queued','running','done','failed','cancelled')
+                                 NOT NULL DEFAULT 'queued',
+  params            TEXT,
+  progress          DOUBLE       NOT NULL DEFAULT 0,
+  info              TEXT,
+  result            LONGTEXT,
+  error             TEXT,
+  owner             VARCHAR(100),
+  cancel_requested  BOOLEAN      NOT NULL DEFAULT FALSE,
+  created_at        DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at        DATETIME,
+  finished_at       DATETIME
+);
+CREATE INDEX idx_job_state ON Job(state, created_at);
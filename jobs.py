@@ -0,0 +1,242 @@
+# ================================================================
+#  jobs.py  –  background jobs for long‑running work (imports,
+#              assignment by filter, full project analysis, exports)
+#
+#  Jobs run on a per‑process thread pool; their state, progress and
+#  result live in the Job table, so any worker can answer status,
+#  result and cancel calls for a job another worker is running.
+#  Cancellation is cooperative: a job stops at its next progress().
+#  Jobs left queued/running by a process that died stay that way until
+#  `manage.py jobs fail-stale` marks them failed.
+#
+#  Job functions take (ctx, params, payload) and return a JSON‑able
+#  result; see JobQueue.register().  Results are encoded with the
+#  queue's *dumps*, so a job can store exactly what the matching
+#  synchronous endpoint would send.
+# ================================================================
+import json, os, socket, threading, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+STATES = ("queued", "running", "done", "failed", "cancelled")
+
+_STATUS = """
+    SELECT id, kind, state, progress, info, error, owner,
+           created_at, started_at, finished_at, cancel_requested
+    FROM   Job
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once a cancel was requested."""
+
+
+class UnknownJobKind(ValueError):
+    pass
+
+
+class JobContext:
+    """Handed to every job function: progress reporting + cancel checks."""
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self.job_id = job_id
+
+    def progress(self, fraction=None, **info):
+        """
+        Record progress (0‥1, or None when the total is unknown) plus any
+        JSON‑able counters, then raise JobCancelled if asked to stop.
+        """
+        if self._queue._progress(self.job_id, fraction, info):
+            raise JobCancelled()
+
+
+class JobQueue:
+
+    def __init__(self, pool, workers=2, dumps=None):
+        self.pool = pool
+        self.workers = workers
+        self.dumps = dumps or (lambda obj: json.dumps(obj, default=str))
+        self._kinds = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def register(self, kind, fn, public=True):
+        """
+        *fn(ctx, params, payload)* returns a JSON‑able result.  Only
+        public kinds may be submitted through POST /jobs; the others
+        are started by their own routes (e.g. an upload body as payload).
+        """
+        self._kinds[kind] = (fn, public)
+
+    def is_public(self, kind):
+        return kind in self._kinds and self._kinds[kind][1]
+
+    def reset_after_fork(self):
+        """Workers must not share the parent's executor threads."""
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    # -----------------------------------------------------------
+    #  DB helpers
+    # -----------------------------------------------------------
+    def _execute(self, sql, params=(), fetch=False):
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            cur = conn.cursor(dictionary=True, buffered=True)
+            try:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if fetch else cur.rowcount
+                conn.commit()
+                return rows
+            finally:
+                cur.close()
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, discard=broken)
+
+    # -----------------------------------------------------------
+    #  API used by the routes
+    # -----------------------------------------------------------
+    def submit(self, kind, params=None, payload=None):
+        """
+        Queue a job; *params* are stored with it, *payload* (e.g. an
+        uploaded body) is only held in memory.  Returns the job id.
+        """
+        if kind not in self._kinds:
+            raise UnknownJobKind(f"unknown job kind {kind!r}")
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO Job (id, kind, state, params, owner) VALUES (%s, %s, 'queued', %s, %s)",
+            (job_id, kind, json.dumps(params or {}, default=str), self.owner),
+        )
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+            self._futures[job_id] = self._executor.submit(
+                self._run, job_id, kind, params or {}, payload
+            )
+        return job_id
+
+    def status(self, job_id):
+        rows = self._execute(_STATUS + "WHERE id = %s", (job_id,), fetch=True)
+        return self._status_row(rows[0]) if rows else None
+
+    @staticmethod
+    def _status_row(job):
+        job["info"] = json.loads(job["info"]) if job["info"] else {}
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        for k in ("created_at", "started_at", "finished_at"):
+            if job[k] is not None:
+                job[k] = job[k].strftime("%Y-%m-%d %H:%M:%S")
+        return job
+
+    def result(self, job_id):
+        """(state, result) – result is None unless state is "done"."""
+        rows = self._execute("SELECT state, result FROM Job WHERE id = %s",
+                             (job_id,), fetch=True)
+        if not rows:
+            return None, None
+        state, result = rows[0]["state"], rows[0]["result"]
+        return state, (json.loads(result) if state == "done" and result else None)
+
+    def recent(self, state=None, limit=50):
+        rows = self._execute(
+            _STATUS + ("WHERE state = %s " if state else "")
+            + "ORDER BY created_at DESC LIMIT %s",
+            (*((state,) if state else ()), limit), fetch=True,
+        )
+        return [self._status_row(r) for r in rows]
+
+    def cancel(self, job_id):
+        """
+        Request cancellation.  A queued job is moved to "cancelled" in the
+        Job table at once, whichever worker owns it (its owner then skips
+        it, see _run()); a running one stops at its next progress().
+        Returns the state afterwards, or None for an unknown job.
+        """
+        if not self._execute(
+            "UPDATE Job SET state = 'cancelled', cancel_requested = TRUE, "
+            "finished_at = NOW() WHERE id = %s AND state = 'queued'",
+            (job_id,),
+        ):
+            self._execute(
+                "UPDATE Job SET cancel_requested = TRUE WHERE id = %s AND state = 'running'",
+                (job_id,),
+            )
+        with self._lock:
+            fut = self._futures.get(job_id)
+        if fut is not None:
+            fut.cancel()            # ours and not started: drop it from the pool
+        job = self.status(job_id)
+        return job and job["state"]
+
+    # -----------------------------------------------------------
+    #  worker side
+    # -----------------------------------------------------------
+    def _progress(self, job_id, fraction, info):
+        self._execute(
+            "UPDATE Job SET progress = COALESCE(%s, progress), info = %s WHERE id = %s",
+            (fraction, json.dumps(info, default=str), job_id),
+        )
+        rows = self._execute("SELECT cancel_requested FROM Job WHERE id = %s",
+                             (job_id,), fetch=True)
+        return bool(rows and rows[0]["cancel_requested"])
+
+    def _finish(self, job_id, state, result=None, error=None):
+        self._execute(
+            """
+            UPDATE Job SET state = %s, result = %s, error = %s, finished_at = NOW(),
+                           progress = IF(%s = 'done', 1, progress)
+            WHERE  id = %s
+            """,
+            (state, None if result is None else self.dumps(result),
+             error, state, job_id),
+        )
+
+    def _run(self, job_id, kind, params, payload):
+        try:
+            started = self._execute(
+                "UPDATE Job SET state = 'running', started_at = NOW() "
+                "WHERE id = %s AND state = 'queued' AND NOT cancel_requested",
+                (job_id,),
+            )
+            if not started:         # cancelled (or failed) while queued
+                self._execute(
+                    "UPDATE Job SET state = 'cancelled', finished_at = NOW() "
+                    "WHERE id = %s AND state = 'queued'",
+                    (job_id,),
+                )
+                return
+            fn, _ = self._kinds[kind]
+            result = fn(JobContext(self, job_id), params, payload)
+            self._finish(job_id, "done", result)
+        except JobCancelled:
+            self._finish(job_id, "cancelled")
+        except Exception as e:
+            self._finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+
+def fail_stale(cur, owner=None):
+    """
+    Mark queued/running jobs failed – all of them, or only those of
+    *owner* ("host:pid").  Only for processes that are gone
+    (`manage.py jobs fail-stale`).  Returns the number of jobs changed.
+    """
+    cur.execute(
+        f"""
+        UPDATE Job SET state = 'failed', error = 'interrupted', finished_at = NOW()
+        WHERE  state IN ('queued','running') {"AND owner = %s" if owner else ""}
+        """,
+        (owner,) if owner else (),
+    )
+    return cur.rowcount
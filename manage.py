@@ -0,0 +1,164 @@
+# ================================================================
+#  manage.py  –  command-line maintenance for the analysis DB
+#
+#    python manage.py import-posts posts.jsonl [--chunk-size 5000]
+#    python manage.py stats verify
+#    python manage.py stats rebuild [--project ID]
+#    python manage.py backfill-reposts
+#    python manage.py jobs fail-stale [--owner HOST:PID]
+#    python manage.py export-project ID out.parquet [--format arrow]
+# ================================================================
+import argparse, json, sys, time
+import mysql.connector
+
+from bulk_import import import_posts, parse_ndjson
+import project_stats, data_version, reposts, jobs, export
+
+
+def connect():
+    with open("db_config.json") as f:
+        cfg = json.load(f)
+    cfg.pop("pool", None)
+    cfg.pop("cache", None)
+    cfg.pop("jobs", None)
+    conn = mysql.connector.connect(**cfg)
+    return conn, conn.cursor(dictionary=True, buffered=True)
+
+
+def cmd_import_posts(args):
+    conn, cur = connect()
+    t0 = time.perf_counter()
+    try:
+        with (sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")) as fh:
+            summary = import_posts(conn, cur, parse_ndjson(fh), args.chunk_size)
+    finally:
+        cur.close()
+        conn.close()
+    secs = time.perf_counter() - t0
+
+    for e in summary["errors"][:20]:
+        print(f"  line {e['ref']}: {e['error']}", file=sys.stderr)
+    if len(summary["errors"]) > 20:
+        print(f"  … {len(summary['errors']) - 20} more errors", file=sys.stderr)
+    print(
+        f"{summary['received']} read, {summary['inserted']} inserted, "
+        f"{summary['duplicates']} duplicates, {len(summary['errors'])} errors "
+        f"in {secs:.2f}s ({summary['received'] / secs if secs else 0:,.0f} posts/s)"
+    )
+    return 1 if summary["errors"] else 0
+
+
+def cmd_stats(args):
+    conn, cur = connect()
+    try:
+        if args.action == "rebuild":
+            project_stats.rebuild(cur, args.project)
+            if args.project:
+                pids = [args.project]
+            else:
+                cur.execute("SELECT id FROM Project")
+                pids = [r["id"] for r in cur.fetchall()]
+            conn.commit()
+            data_version.bump_committed(conn, cur, "project:*",
+                                        *(f"project:{p}" for p in pids))
+            print("Completion counters rebuilt"
+                  + (f" for project {args.project}" if args.project else ""))
+            return 0
+
+        mismatches = project_stats.verify(cur)
+        for m in mismatches:
+            print(f"  project {m['project_id']}: {m['counter']} "
+                  f"stored {m['stored']}, expected {m['expected']}")
+        print(f"{len(mismatches)} counter(s) out of step"
+              + ("; run `manage.py stats rebuild`" if mismatches else ""))
+        return 1 if mismatches else 0
+    finally:
+        cur.close()
+        conn.close()
+
+
+def cmd_backfill_reposts(args):
+    conn, cur = connect()
+    try:
+        changed = reposts.backfill(cur)
+        conn.commit()
+        data_version.bump_committed(conn, cur, "posts")
+    finally:
+        cur.close()
+        conn.close()
+    print("Repost columns backfilled: "
+          + ", ".join(f"{col} {n} row(s)" for col, n in changed.items()))
+    return 0
+
+
+def cmd_jobs(args):
+    conn, cur = connect()
+    try:
+        n = jobs.fail_stale(cur, args.owner)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    print(f"{n} stale job(s) marked failed"
+          + (f" for {args.owner}" if args.owner else ""))
+    return 0
+
+
+def cmd_export_project(args):
+    if export.pa is None:
+        sys.exit("export-project needs `pip install pyarrow`")
+    fmt = args.format or ("arrow" if args.out.endswith((".arrow", ".arrows")) else "parquet")
+    conn, cur = connect()
+    cur.close()
+    cur = conn.cursor(dictionary=True)      # unbuffered: rows stream in
+    t0 = time.perf_counter()
+    try:
+        rows = export.write_file(cur, args.project, fmt, args.out, args.batch_rows)
+    finally:
+        cur.close()
+        conn.close()
+    print(f"{rows} post(s) of project {args.project} written to {args.out} "
+          f"({fmt}) in {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Social‑Media Analysis DB maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("import-posts", help="bulk‑load posts from a JSONL/NDJSON file")
+    p.add_argument("file", help="path to the .jsonl file, or - for stdin")
+    p.add_argument("--chunk-size", type=int, default=5000, help="rows per commit")
+    p.set_defaults(func=cmd_import_posts)
+
+    p = sub.add_parser("stats", help="check or rebuild project completion counters")
+    p.add_argument("action", choices=("verify", "rebuild"))
+    p.add_argument("--project", type=int, help="rebuild one project only")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("backfill-reposts",
+                       help="recompute Post.is_repost / repost_count / root_post_id")
+    p.set_defaults(func=cmd_backfill_reposts)
+
+    p = sub.add_parser("jobs", help="clean up jobs left behind by dead workers")
+    p.add_argument("action", choices=("fail-stale",))
+    p.add_argument("--owner", help="only jobs of this worker (host:pid), "
+                                   "default all queued/running jobs")
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("export-project",
+                       help="write a project's analysis as a wide Parquet/Arrow table")
+    p.add_argument("project", type=int, help="project id")
+    p.add_argument("out", help="output file")
+    p.add_argument("--format", choices=tuple(export.FORMATS),
+                   help="default: from the file extension (.arrow/.arrows), else parquet")
+    p.add_argument("--batch-rows", type=int, default=export.EXPORT_BATCH,
+                   help="posts per record batch / row group")
+    p.set_defaults(func=cmd_export_project)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
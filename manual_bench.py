@@ -0,0 +1,327 @@
+import json, os, time
+from concurrent.futures import ThreadPoolExecutor
+import mysql.connector
+
+from app import app, group_experiments, CACHE
+from bulk_import import import_posts
+import project_stats
+from dim_cache import DIMS
+
+# Same database the API talks to (pool/cache settings are not connect() args)
+with open("db_config.json") as f:
+    db_cfg = json.load(f)
+db_cfg.pop("pool", None)
+db_cfg.pop("cache", None)
+db_cfg.pop("jobs", None)
+
+client = app.test_client()
+CACHE.enabled = False      # measure the query path, not cache hits
+
+# Separate connection used for seeding and for reading server counters
+conn = mysql.connector.connect(**db_cfg)
+conn.autocommit = True
+cur = conn.cursor()
+
+
+def questions():
+    """Server-wide statement counter – deltas give round trips per call."""
+    cur.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    return int(cur.fetchone()[1])
+
+
+def report(name, rows):
+    print(f"\n{name}")
+    print(f"  {'size':>8} {'round trips':>12} {'ms':>10}")
+    for size, trips, ms in rows:
+        print(f"  {size:>8} {trips:>12} {ms:>10.1f}")
+
+
+# ---------------------------------------------------------------
+#  Seed helpers – everything lives under the 'bench' platform
+# ---------------------------------------------------------------
+def seed_platform():
+    cur.execute("INSERT IGNORE INTO SocialMedia (name) VALUES ('bench')")
+    cur.execute("SELECT id FROM SocialMedia WHERE name='bench'")
+    media_id = cur.fetchone()[0]
+    cur.execute(
+        "INSERT IGNORE INTO `User` (username, social_media_id) VALUES ('bench_user', %s)",
+        (media_id,),
+    )
+    cur.execute(
+        "SELECT id FROM `User` WHERE username='bench_user' AND social_media_id=%s",
+        (media_id,),
+    )
+    return media_id, cur.fetchone()[0]
+
+
+def seed_project(name, n_posts, fields=("sentiment", "topic")):
+    media_id, user_id = seed_platform()
+    cur.execute(
+        "INSERT INTO Project (name, start_date, end_date) VALUES (%s, '2025-01-01', '2025-12-31')",
+        (name,),
+    )
+    project_id = cur.lastrowid
+    field_ids = []
+    for fld in fields:
+        cur.execute(
+            "INSERT INTO ProjectField (project_id, name) VALUES (%s, %s)",
+            (project_id, fld),
+        )
+        field_ids.append(cur.lastrowid)
+
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM Post")
+    base = cur.fetchone()[0]
+    cur.executemany(
+        "INSERT INTO Post (user_id, social_media_id, post_time, content) "
+        "VALUES (%s, %s, FROM_UNIXTIME(%s), %s)",
+        [(user_id, media_id, 1_700_000_000 + base + i, f"bench post {i}")
+         for i in range(n_posts)],
+    )
+    cur.execute(
+        "INSERT INTO ProjectPost (project_id, post_id) "
+        "SELECT %s, id FROM Post WHERE social_media_id=%s AND id > %s",
+        (project_id, media_id, base),
+    )
+    for fid in field_ids:
+        cur.execute(
+            "INSERT INTO AnalysisResult (project_post_id, field_id, value) "
+            "SELECT id, %s, 'x' FROM ProjectPost WHERE project_id=%s",
+            (fid, project_id),
+        )
+    project_stats.rebuild(cur, project_id)
+    return project_id
+
+
+def cleanup():
+    cur.execute("SELECT id FROM SocialMedia WHERE name='bench'")
+    row = cur.fetchone()
+    if not row:
+        return
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cur.execute(
+        "DELETE ar FROM AnalysisResult ar JOIN ProjectPost pp ON pp.id = ar.project_post_id "
+        "JOIN Project p ON p.id = pp.project_id WHERE p.name LIKE 'bench-%'"
+    )
+    cur.execute(
+        "DELETE pp FROM ProjectPost pp JOIN Project p ON p.id = pp.project_id "
+        "WHERE p.name LIKE 'bench-%'"
+    )
+    cur.execute(
+        "DELETE f FROM ProjectField f JOIN Project p ON p.id = f.project_id "
+        "WHERE p.name LIKE 'bench-%'"
+    )
+    for stats in ("ProjectFieldStats", "ProjectStats"):
+        cur.execute(
+            f"DELETE s FROM {stats} s JOIN Project p ON p.id = s.project_id "
+            "WHERE p.name LIKE 'bench-%'"
+        )
+    cur.execute("DELETE FROM Project WHERE name LIKE 'bench-%'")
+    cur.execute("DELETE FROM Repost WHERE reposter_id IN (SELECT id FROM `User` WHERE social_media_id=%s)", row)
+    cur.execute("DELETE FROM Post WHERE social_media_id=%s", row)
+    cur.execute("DELETE FROM `User` WHERE social_media_id=%s", row)
+    cur.execute("DELETE FROM SocialMedia WHERE id=%s", row)
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    DIMS.clear()                  # the bench platform/users are gone
+
+
+# ---------------------------------------------------------------
+#  1. /query_project_analysis  –  round trips must not grow with size
+# ---------------------------------------------------------------
+def bench_project_analysis(sizes=(10, 1_000, 50_000)):
+    rows = []
+    for n in sizes:
+        pid = seed_project(f"bench-analysis-{n}", n)
+        client.get("/query_project_analysis", query_string={"project_id": pid})  # warm pool
+        before = questions()
+        t0 = time.perf_counter()
+        r = client.get("/query_project_analysis", query_string={"project_id": pid})
+        ms = (time.perf_counter() - t0) * 1000
+        trips = questions() - before - 1          # minus our own SHOW
+        assert r.status_code == 200 and len(r.json["posts"]) == n
+        rows.append((n, trips, ms))
+    report("query_project_analysis", rows)
+    trips = {t for _, t, _ in rows}
+    print("  [PASS] round trips constant" if len(trips) == 1
+          else f"  [FAIL] round trips vary with size: {sorted(trips)}")
+
+
+# ---------------------------------------------------------------
+#  2. bulk post import  –  target > 20k posts/s
+# ---------------------------------------------------------------
+def bench_import(n=100_000, users=1_000, chunk_size=5000):
+    records = (
+        (i, {
+            "username": f"bench_u{i % users}",
+            "social_media": "bench",
+            "post_time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i)),
+            "content": f"imported post {i}",
+            "likes": i % 50,
+        }, None)
+        for i in range(n)
+    )
+    dict_cur = conn.cursor(dictionary=True, buffered=True)
+    t0 = time.perf_counter()
+    summary = import_posts(conn, dict_cur, records, chunk_size)
+    secs = time.perf_counter() - t0
+    dict_cur.close()
+    rate = summary["inserted"] / secs
+    print(f"\nimport_posts: {summary['inserted']} posts in {secs:.2f}s = {rate:,.0f} posts/s")
+    print("  [PASS] > 20k posts/s" if rate > 20_000 else "  [FAIL] below 20k posts/s")
+
+
+# ---------------------------------------------------------------
+#  3. combo_post_to_experiment grouping  –  linear in joined rows
+# ---------------------------------------------------------------
+def bench_grouping(n_rows=(25_000, 50_000, 100_000), fields=10, projects=3):
+    rows_out = []
+    for n in n_rows:
+        n_posts = n // fields
+        posts = [{"id": i, "text": f"p{i}"} for i in range(n_posts)]
+        rows = [
+            {"project_name": f"exp{i % projects}", "post_id": i,
+             "field_name": f"f{k}", "value": "x"}
+            for i in range(n_posts) for k in range(fields)
+        ]
+        t0 = time.perf_counter()
+        exps = group_experiments(posts, rows)
+        ms = (time.perf_counter() - t0) * 1000
+        assert sum(len(e["posts"]) for e in exps.values()) == n_posts
+        rows_out.append((n, 0, ms))
+    report("group_experiments (round trips n/a)", rows_out)
+    (n0, _, t0), (n1, _, t1) = rows_out[0], rows_out[-1]
+    ratio = (t1 / t0) / (n1 / n0)
+    print(f"  [PASS] time grows linearly (x{ratio:.2f} of row growth)" if ratio < 2
+          else f"  [FAIL] superlinear growth (x{ratio:.2f} of row growth)")
+
+
+# ---------------------------------------------------------------
+#  4. reposts  –  single /repost vs /repost_batch throughput
+# ---------------------------------------------------------------
+def bench_reposts(n_single=500, n_batch=20_000, originals=1_000, reposters=200):
+    media_id, _ = seed_platform()
+    cur.executemany(
+        "INSERT IGNORE INTO `User` (username, social_media_id) VALUES (%s, %s)",
+        [(f"bench_r{i}", media_id) for i in range(reposters)],
+    )
+    cur.execute("SELECT id FROM `User` WHERE username='bench_user' AND social_media_id=%s",
+                (media_id,))
+    author = cur.fetchone()[0]
+    cur.executemany(
+        "INSERT INTO Post (user_id, social_media_id, post_time, content) "
+        "VALUES (%s, %s, FROM_UNIXTIME(%s), %s)",
+        [(author, media_id, 1_500_000_000 + i, f"original {i}") for i in range(originals)],
+    )
+    cur.execute("SELECT id FROM Post WHERE social_media_id=%s AND content LIKE 'original %%'",
+                (media_id,))
+    ids = [r[0] for r in cur.fetchall()]
+
+    def item(k):
+        return {
+            "original_post_id": ids[k % len(ids)],
+            "reposter_username": f"bench_r{k % reposters}",
+            "repost_time": time.strftime("%Y-%m-%d %H:%M:%S",
+                                         time.gmtime(1_600_000_000 + k)),
+        }
+
+    rows = []
+    before, t0 = questions(), time.perf_counter()
+    for k in range(n_single):
+        assert client.post("/repost", json=item(k)).status_code == 201
+    secs = time.perf_counter() - t0
+    rows.append(("single", n_single, (questions() - before - 1) / n_single, n_single / secs))
+
+    batch = [item(n_single + k) for k in range(n_batch)]
+    before, t0 = questions(), time.perf_counter()
+    r = client.post("/repost_batch", json={"reposts": batch})
+    secs = time.perf_counter() - t0
+    assert r.status_code == 201 and r.json["recorded"] == n_batch, r.json
+    rows.append(("batch", n_batch, (questions() - before - 1) / n_batch, n_batch / secs))
+
+    print("\nreposts")
+    print(f"  {'mode':>8} {'reposts':>8} {'trips/repost':>13} {'reposts/s':>10}")
+    for mode, n, trips, rate in rows:
+        print(f"  {mode:>8} {n:>8} {trips:>13.2f} {rate:>10,.0f}")
+
+    cur.execute("SELECT COALESCE(SUM(repost_count), 0) FROM Post WHERE social_media_id=%s",
+                (media_id,))
+    total = int(cur.fetchone()[0])
+    print("  [PASS] repost_count matches" if total == n_single + n_batch
+          else f"  [FAIL] repost_count sums to {total}")
+
+
+# ---------------------------------------------------------------
+#  5. bulk project assignment  –  100k posts in seconds
+# ---------------------------------------------------------------
+def bench_assign(n=100_000, unknown=1_000):
+    media_id, user_id = seed_platform()
+    pid = seed_project(f"bench-assign-{n}", 0)
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM Post")
+    base = cur.fetchone()[0]
+    cur.executemany(
+        "INSERT INTO Post (user_id, social_media_id, post_time, content) "
+        "VALUES (%s, %s, FROM_UNIXTIME(%s), %s)",
+        [(user_id, media_id, 1_400_000_000 + i, f"assign {i}") for i in range(n)],
+    )
+    cur.execute("SELECT id FROM Post WHERE social_media_id=%s AND id > %s", (media_id, base))
+    ids = [r[0] for r in cur.fetchall()]
+    bogus = list(range(10**9, 10**9 + unknown))
+
+    t0 = time.perf_counter()
+    r = client.post("/assign_posts_to_project", json={"project_id": pid, "post_ids": ids + bogus})
+    secs = time.perf_counter() - t0
+    assert r.status_code == 201 and r.json["linked"] == len(ids), r.json
+    assert len(r.json["unknown_ids"]) == unknown
+    print(f"\nassign_posts_to_project: {len(ids)} posts linked in {secs:.2f}s")
+    print("  [PASS] under 10s" if secs < 10 else "  [FAIL] 10s or more")
+
+
+# ---------------------------------------------------------------
+#  6. WSGI vs ASGI serving under concurrent slow reads
+#     Start both servers first, e.g.
+#       python serve.py --bind 127.0.0.1:5001        (or python app.py)
+#       uvicorn asgi_app:app --port 5002
+#     and set BENCH_WSGI_URL / BENCH_ASGI_URL to their base URLs.
+# ---------------------------------------------------------------
+def bench_serving(wsgi_url, asgi_url, path="/search_post?content=bench*",
+                  concurrency=(50, 200, 1000), per_client=5):
+    import requests
+
+    def one(url):
+        t0 = time.perf_counter()
+        try:
+            ok = requests.get(url, timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - t0) * 1000
+
+    print(f"\nserving {path}")
+    print(f"  {'mode':>5} {'clients':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, base in (("wsgi", wsgi_url), ("asgi", asgi_url)):
+        for clients in concurrency:
+            n = clients * per_client
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(clients) as ex:
+                results = list(ex.map(one, [base + path] * n))
+            secs = time.perf_counter() - t0
+            lat = sorted(ms for _, ms in results)
+            errors = sum(not ok for ok, _ in results)
+            print(f"  {mode:>5} {clients:>8} {n / secs:>9.0f} "
+                  f"{lat[len(lat) // 2]:>9.1f} {lat[int(len(lat) * 0.99)]:>9.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    cleanup()
+    try:
+        bench_project_analysis()
+        bench_import()
+        bench_grouping()
+        bench_reposts()
+        bench_assign()
+        if os.environ.get("BENCH_WSGI_URL") and os.environ.get("BENCH_ASGI_URL"):
+            bench_serving(os.environ["BENCH_WSGI_URL"], os.environ["BENCH_ASGI_URL"])
+        else:
+            print("\nserving: skipped (set BENCH_WSGI_URL and BENCH_ASGI_URL)")
+    finally:
+        cleanup()
+        cur.close()
+        conn.close()
@@ -182,7 +182,381 @@ def test_repost_fk():
 
 run_test("Insert Repost for non-existent post", test_repost_fk, expect_success=False)
 
+# 12. Date-range listing must stay sargable (EXPLAIN guard)
+# get_posts_in_range() filters post_time with a bare half-open range;
+#   the plan must actually read Post through idx_post_time, or through
+#   idx_social_time when a platform is given – never a full scan.
+from app import parse_range, posts_in_range_query
+
+def run_explain(name, sql, params, index):
+    cur.execute("EXPLAIN " + sql, params)
+    cols = [c[0] for c in cur.description]
+    plan = [dict(zip(cols, r)) for r in cur.fetchall()]
+    post = next(r for r in plan if r["table"] in ("Post", "p"))
+    if post["key"] == index and post["type"] != "ALL":
+        print(f"[PASS] {name} → key {post['key']} (type={post['type']})")
+    else:
+        print(f"[FAIL] {name} → chose key={post['key']} type={post['type']} "
+              f"(candidates {post['possible_keys']})")
+
+def seed_posts(n=3000):
+    """Spread posts over 30 years so a one-year range is selective and
+    the optimizer's statistics are not those of a near-empty table."""
+    cur.executemany(
+        "INSERT INTO Post (user_id, social_media_id, post_time, content) "
+        "VALUES (%s, %s, %s, 'seed')",
+        [(user_id, platform_id, f"{2000 + i % 30}-06-01 00:{i // 30 // 60:02d}:{i // 30 % 60:02d}")
+         for i in range(n)],
+    )
+    cur.execute("ANALYZE TABLE Post")
+    cur.fetchall()
+
+run_test("Seed posts for the EXPLAIN checks", seed_posts)
+
+lo, hi = parse_range("2025-01-01", "2025-12-31")
+run_explain("Range query uses idx_post_time",
+            *posts_in_range_query(lo, hi), "idx_post_time")
+run_explain("Range + platform uses idx_social_time",
+            *posts_in_range_query(lo, hi, platform="Twitter"), "idx_social_time")
+
+# Checks below compare a value instead of expecting a DB error
+
+def check(name, ok, detail=""):
+    print(f"[PASS] {name}" if ok else f"[FAIL] {name} → {detail}")
+
+# 13. Paging cursors round-trip and reject garbage
+# encode_cursor()/page_args() must give back the exact key of the last
+#   row, and a truncated, non-base64 or wrong-shape token must be a
+#   ValueError (→ 400), never a 500.
+from datetime import datetime
+from app import encode_cursor, decode_cursor, page_args, search_body, MAX_PAGE
+
+def cursor_roundtrip():
+    t = datetime(2025, 5, 6, 21, 50, 26)
+    tok = encode_cursor("2025-05-06 21:50:26", 42)
+    got = page_args("time", {"limit": "10", "cursor": tok})
+    check("Time cursor round-trips", got == (10, (t, 42)), got)
+    got = page_args("name", {"cursor": encode_cursor("alice")})
+    check("Name cursor round-trips", got[1] == "alice", got)
+    got = page_args("score", {"cursor": encode_cursor(1.5, 7)})
+    check("Score cursor round-trips", got[1] == (1.5, 7), got)
+    check("Cursor is URL-safe", all(c.isalnum() or c in "-_" for c in tok), tok)
+    check("Limit is capped at MAX_PAGE",
+          page_args("time", {"limit": "999999"})[0] == MAX_PAGE)
+    try:
+        page_args("time", {"limit": "ten"})
+        check("Non-numeric limit rejected", False, "accepted")
+    except ValueError as e:
+        check("Non-numeric limit rejected", str(e) == "limit must be an integer", e)
+
+cursor_roundtrip()
+
+def malformed_cursors():
+    for label, tok in [("not base64", "%%%"), ("truncated", encode_cursor("x", 1)[:-3]),
+                       ("not a list", "eyJhIjoxfQ"),            # {"a":1}
+                       ("wrong arity", encode_cursor("2025-05-06 21:50:26")),
+                       ("bad time", encode_cursor("yesterday", 1))]:
+        try:
+            page_args("time", {"cursor": tok})
+            check(f"Malformed cursor ({label}) rejected", False, "accepted")
+        except ValueError:
+            check(f"Malformed cursor ({label}) rejected", True)
+    check("decode_cursor keeps lists only", isinstance(decode_cursor(encode_cursor(1, 2)), list))
+
+malformed_cursors()
+
+# 14. search_body cuts the look-ahead post at a page boundary
+# The paged query fetches limit+1 posts; rows of the extra post (one per
+#   project it is linked to) must be dropped and the cursor must point
+#   at the last post actually returned.
+def page_boundary():
+    t = datetime(2025, 5, 6, 12, 0, 0)
+    row = lambda i, proj: {"id": i, "text": "x", "post_time": t, "social_media": "X",
+                           "username": "u", "project_name": proj}
+    rows = [row(3, "A"), row(3, "B"), row(2, None), row(1, "A"), row(1, "B")]
+    body = search_body(rows, None, False, 2)
+    ids = sorted({p["id"] for e in body["experiments"].values() for p in e["posts"]})
+    check("Look-ahead post cut from the page", ids == [2, 3], ids)
+    check("A post in two projects stays on one page",
+          len(body["experiments"]["A"]["posts"]) == 1 and "B" in body["experiments"])
+    check("next_cursor points at the last returned post",
+          page_args("time", {"cursor": body["next_cursor"]})[1] == (t, 2), body["next_cursor"])
+    body = search_body(rows[:3], None, False, 2)
+    check("Last page has no next_cursor", body["next_cursor"] is None, body["next_cursor"])
+
+page_boundary()
+
+# 15. Bulk endpoints through the API – shared fixture
+# The checks below run against the app's own database (db_config.json)
+#   under a unique tag; bulk_cleanup() removes what they created.
+#   Per-record failures must come back in "errors" while the valid
+#   records are saved.
+import time as _time
+import app as api
+
+client = api.app.test_client()
+tag = f"mt{int(_time.time())}"
+
+def bulk_fixture():
+    """Two posts by two users on a fresh platform, and an empty project."""
+    with api.db_cursor() as (c_conn, c):
+        c.execute("INSERT INTO SocialMedia (name) VALUES (%s)", (f"{tag}_net",))
+        net, ids = c.lastrowid, []
+        for hour, who in ((10, "a"), (11, "b")):
+            c.execute("INSERT INTO `User` (username, social_media_id) VALUES (%s, %s)",
+                      (f"{tag}_{who}", net))
+            c.execute("INSERT INTO Post (user_id, social_media_id, post_time, content) "
+                      "VALUES (%s, %s, %s, %s)",
+                      (c.lastrowid, net, f"2025-05-06 {hour}:00:00", f"bulk {who}"))
+            ids.append(c.lastrowid)
+        c.execute("INSERT INTO Institute (name) VALUES (%s)", (f"{tag}_inst",))
+        c.execute("INSERT INTO Project (name, institute_id, start_date, end_date) "
+                  "VALUES (%s, %s, '2025-01-01', '2025-12-31')",
+                  (f"{tag}_project", c.lastrowid))
+        pid = c.lastrowid
+        c_conn.commit()
+    return ids, pid
+
+def bulk_cleanup(pid):
+    with api.db_cursor() as (c_conn, c):
+        c.execute("DELETE ar FROM AnalysisResult ar JOIN ProjectPost pp "
+                  "ON pp.id = ar.project_post_id WHERE pp.project_id = %s", (pid,))
+        for table in ("ProjectFieldStats", "ProjectStats", "ProjectField", "ProjectPost"):
+            c.execute(f"DELETE FROM {table} WHERE project_id = %s", (pid,))
+        c.execute("DELETE FROM Project WHERE id = %s", (pid,))
+        c.execute("DELETE FROM Institute WHERE name = %s", (f"{tag}_inst",))
+        c.execute("DELETE r FROM Repost r JOIN Post p ON p.id = r.original_post_id "
+                  "JOIN SocialMedia s ON s.id = p.social_media_id WHERE s.name = %s",
+                  (f"{tag}_net",))
+        c.execute("DELETE p FROM Post p JOIN SocialMedia s ON s.id = p.social_media_id "
+                  "WHERE s.name = %s", (f"{tag}_net",))
+        c.execute("DELETE u FROM `User` u JOIN SocialMedia s ON s.id = u.social_media_id "
+                  "WHERE s.name = %s", (f"{tag}_net",))
+        c.execute("DELETE FROM SocialMedia WHERE name = %s", (f"{tag}_net",))
+        c_conn.commit()
+    api.dim_cache.DIMS.clear()
+
+def bulk_check(fn):
+    """Run fn(post_ids, project_id) on the fixture; an exception is a FAIL."""
+    if BULK is None:
+        return
+    try:
+        fn(*BULK)
+    except Exception as e:
+        print(f"[FAIL] {fn.__name__} → {type(e).__name__}: {e}")
+
+try:
+    BULK = bulk_fixture()
+except Exception as e:          # e.g. the app database is not set up
+    print(f"[FAIL] Bulk endpoint fixture → {type(e).__name__}: {e}")
+    BULK = None
+
+# 16. enter_analysis_results saves valid records, reports the rest
+# Records with a bad post id or empty results are reported by index;
+#   the valid one is saved and the completion counters follow it.
+#   Field names resolve as MySQL compares them, not by Python equality.
+def enter_results(ids, pid):
+    r = client.post("/enter_analysis_results", json={"project_id": pid, "records": [
+        {"post_id": ids[0], "results": {"sentiment": "positive"}},
+        {"post_id": "x", "results": {"sentiment": "negative"}},
+        {"post_id": ids[1], "results": {}},
+    ]})
+    j = r.get_json()
+    check("enter_analysis_results saves valid records",
+          r.status_code == 201 and j["posts_saved"] == 1, j)
+    check("enter_analysis_results reports bad records by index",
+          [e["index"] for e in j["errors"]] == [1, 2], j["errors"])
+    j = client.get("/query_project_analysis", query_string={"project_id": pid}).get_json()
+    check("Completion counters follow the bulk write",
+          j["field_completion"].get("sentiment") == 100.0, j["field_completion"])
+
+    # MySQL matches field names by collation: these are all "sentiment"
+    r = client.post("/enter_analysis_results", json={"project_id": pid, "records": [
+        {"post_id": ids[0], "results": {"SENTIMENT": "neutral"}},
+        {"post_id": ids[0], "results": {"séntiment": "neutral"}},
+        {"post_id": True, "results": {"sentiment": "negative"}},
+    ]})
+    j = r.get_json()
+    check("Case/accent variants resolve to the existing field",
+          r.status_code == 201 and j["values_saved"] == 2, j)
+    check("Boolean post_id is rejected", [e["index"] for e in j["errors"]] == [2], j["errors"])
+    j = client.get("/query_project_analysis", query_string={"project_id": pid}).get_json()
+    check("No field created for a name variant",
+          list(j["field_completion"]) == ["sentiment"], j["field_completion"])
+
+bulk_check(enter_results)
+
+# 17. import_posts saves valid NDJSON lines, reports the rest by number
+# A re-import of the same lines must count them as duplicates; values
+#   the schema cannot store must be reported, not truncated or skipped.
+import json as _json
+
+def import_lines(ids, pid):
+    ndjson = "\n".join([
+        _json.dumps({"username": f"{tag}_c", "social_media": f"{tag}_net",
+                     "post_time": "2025-05-07 10:00:00", "content": "bulk one"}),
+        _json.dumps({"username": f"{tag}_d", "social_media": f"{tag}_net",
+                     "post_time": "2025-05-07 11:00:00", "content": "bulk two"}),
+        "{not json",
+        _json.dumps({"username": f"{tag}_e", "social_media": f"{tag}_net"}),
+    ])
+    r = client.post("/import_posts", data=ndjson, content_type="application/x-ndjson")
+    j = r.get_json()
+    check("import_posts saves valid lines", r.status_code == 201 and j["inserted"] == 2, j)
+    check("import_posts reports bad lines by number",
+          [e["ref"] for e in j["errors"]] == [3, 4], j["errors"])
+    j = client.post("/import_posts", data=ndjson, content_type="application/x-ndjson").get_json()
+    check("Re-import counts duplicates", j["inserted"] == 0 and j["duplicates"] == 2, j)
+
+    # values the schema cannot hold are per-line errors, never duplicates
+    ndjson = "\n".join(_json.dumps({"username": f"{tag}_f", "social_media": f"{tag}_net",
+                                    "post_time": f"2025-05-07 12:00:0{i}", "content": "x",
+                                    **extra})
+                       for i, extra in enumerate([{"username": "u" * 41}, {"likes": -1},
+                                                  {"city": "c" * 101}, {"age": "old"}]))
+    j = client.post("/import_posts", data=ndjson, content_type="application/x-ndjson").get_json()
+    check("Out-of-schema values are reported per line",
+          [e["ref"] for e in j["errors"]] == [1, 2, 3, 4]
+          and j["inserted"] == j["duplicates"] == 0, j)
+    check("Over-long username is not blamed on a name clash",
+          "40 characters" in j["errors"][0]["error"], j["errors"][0])
+
+bulk_check(import_lines)
+
+# 18. repost_batch records valid reposts, reports the rest by index
+def repost_items(ids, pid):
+    r = client.post("/repost_batch", json={"reposts": [
+        {"original_post_id": ids[0], "reposter_username": f"{tag}_b",
+         "repost_time": "2025-05-06 12:00:00"},
+        {"original_post_id": ids[0], "reposter_username": f"{tag}_nobody",
+         "repost_time": "2025-05-06 12:00:00"},
+        {"original_post_id": ids[0]},
+    ]})
+    j = r.get_json()
+    check("repost_batch records valid reposts", r.status_code == 201 and j["recorded"] == 1, j)
+    check("repost_batch reports bad items by index",
+          [e["index"] for e in j["errors"]] == [1, 2], j["errors"])
+
+bulk_check(repost_items)
+
+# 19. assign_posts_to_project links known ids, reports unknown ones
+# Earlier sections may already have linked a fixture post, so the first
+#   call is judged on linked + already_linked.
+def assign_ids(ids, pid):
+    j = client.post("/assign_posts_to_project",
+                    json={"project_id": pid, "post_ids": ids + [2**31 - 1]}).get_json()
+    check("assign_posts_to_project links known ids",
+          j["linked"] + j["already_linked"] == 2 and j["unknown_ids"] == [2**31 - 1], j)
+    j = client.post("/assign_posts_to_project",
+                    json={"project_id": pid, "post_ids": ids}).get_json()
+    check("Re-assigning reports already_linked", j["linked"] == 0 and j["already_linked"] == 2, j)
+
+bulk_check(assign_ids)
+
+# 20. assign_posts_by_filter refuses a filter it cannot apply exactly
+# A misspelt key ("form_time") must be a 400, not a filter that links
+#   every post of the platform.
+def assign_filter_keys(ids, pid):
+    r = client.post("/assign_posts_by_filter",
+                    json={"project_id": pid, "filter": {"social_media": f"{tag}_net",
+                                                        "form_time": "2025-01-01 00:00:00"}})
+    check("assign_posts_by_filter rejects unknown keys", r.status_code == 400, r.get_json())
+
+bulk_check(assign_filter_keys)
+
+# 21. Response cache memory backend: LRU order, TTL and byte bound
+# No database needed.  Tag versions come only from the versions callable
+#   (DataVersion in the app), so a bump must turn the next read into a miss.
+from flask import Flask
+from response_cache import MemoryBackend, ResponseCache
+
+def memory_backend():
+    b = MemoryBackend(max_entries=2, max_bytes=10)
+    b.set("a", b"1", 60)
+    b.set("b", b"2", 60)
+    b.get("a")                                  # "b" is now least recent
+    b.set("c", b"3", 60)
+    check("LRU evicts the least recently used entry",
+          b.get("b") is None and b.get("a") == b"1" and b.get("c") == b"3", b.size())
+    b.set("big", b"x" * 11, 60)
+    check("Entry larger than max_bytes is not stored", b.get("big") is None, b.size())
+    b.set("d", b"x" * 9, 60)
+    check("Byte bound evicts older entries",
+          b.size()["bytes"] <= 10 and b.get("d") == b"x" * 9 and b.get("a") is None, b.size())
+    b.set("e", b"5", 0.05)
+    _time.sleep(0.1)
+    check("Expired entry is a miss and is dropped",
+          b.get("e") is None and "e" not in b._data, b.size())
+
+def cache_versions():
+    versions = {"posts": 0}
+    calls = []
+    cache = ResponseCache(MemoryBackend(), 60, True,
+                          versions=lambda deps: [versions[t] for t in deps])
+    mini = Flask("mini")
+
+    @mini.route("/n")
+    @cache.cached(["posts"])
+    def n():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    c = mini.test_client()
+    c.get("/n"); c.get("/n")
+    check("Unchanged versions serve from cache", len(calls) == 1 and cache.hits == 1, calls)
+    versions["posts"] += 1
+    check("A version bump retires the entry", c.get("/n").get_json() == {"n": 2}, calls)
+
+memory_backend()
+cache_versions()
+
+# 22. NDJSON negotiation is shared by the WSGI and ASGI apps
+# Every Accept entry and its q-value counts, not just the first one.
+from app import negotiate_stream
+
+def accept_negotiation():
+    for accept, want in [(None, False), ("application/x-ndjson", True),
+                         ("text/html, application/x-ndjson", True),
+                         ("application/x-ndjson;q=0.5, application/json", False),
+                         ("*/*", False)]:
+        check(f"Accept {accept!r} → stream={want}", negotiate_stream(None, accept) == want)
+    check("?stream=1 wins over Accept", negotiate_stream("1", "application/json"))
+
+accept_negotiation()
+
+# 23. Relevance paging walks tied scores without skips or repeats
+# Posts with identical content score identically; paging by relevance
+#   must still return each of them exactly once, ordered by id.
+def relevance_walk(ids, pid):
+    word = f"{tag}tie"
+    with api.db_cursor() as (c_conn, c):
+        c.execute("SELECT user_id, social_media_id FROM Post WHERE id = %s", (ids[0],))
+        owner = c.fetchone()
+        for sec in range(7):
+            c.execute("INSERT INTO Post (user_id, social_media_id, post_time, content) "
+                      "VALUES (%s, %s, %s, %s)",
+                      (owner["user_id"], owner["social_media_id"],
+                       f"2025-05-08 10:00:{sec:02d}", f"{word} same words"))
+        c_conn.commit()
+    seen, cursor, pages = [], None, 0
+    while pages < 10:
+        q = {"content": word, "sort": "relevance", "limit": 3}
+        if cursor:
+            q["cursor"] = cursor
+        j = client.get("/search_post", query_string=q).get_json()
+        seen += [p["id"] for e in j["experiments"].values() for p in e["posts"]]
+        cursor, pages = j["next_cursor"], pages + 1
+        if not cursor:
+            break
+    check("Relevance pages cover tied posts once each",
+          len(seen) == 7 and len(set(seen)) == 7, seen)
+    check("Tied posts are ordered by id, newest id first", seen == sorted(seen, reverse=True), seen)
+
+bulk_check(relevance_walk)
+
 # Cleanup
+if BULK is not None:
+    bulk_cleanup(BULK[1])
 conn.rollback()
 cur.close()
 conn.close()
\ No newline at end of file
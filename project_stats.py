@@ -0,0 +1,147 @@
+# ================================================================
+#  project_stats.py  –  materialised per‑project completion counters
+#
+#  ProjectStats.post_count       = rows in ProjectPost for the project
+#  ProjectFieldStats.filled      = rows in AnalysisResult for the field
+#
+#  The write routes bump these inside their own transaction; rebuild()
+#  and verify() (`manage.py stats …`) reconcile against base tables.
+# ================================================================
+
+
+def add_posts(cur, project_id, n):
+    """Count *n* newly linked posts (n may be 0 to just create the row)."""
+    cur.execute(
+        """
+        INSERT INTO ProjectStats (project_id, post_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE post_count = post_count + VALUES(post_count)
+        """,
+        (project_id, n),
+    )
+
+
+def add_fills(cur, project_id, counts):
+    """*counts*: {field_id: newly created AnalysisResult rows}."""
+    rows = [(fid, project_id, n) for fid, n in counts.items() if n]
+    if not rows:
+        return
+    cur.execute(
+        "INSERT INTO ProjectFieldStats (field_id, project_id, filled) VALUES "
+        + ",".join(["(%s,%s,%s)"] * len(rows))
+        + " ON DUPLICATE KEY UPDATE filled = filled + VALUES(filled)",
+        tuple(v for r in rows for v in r),
+    )
+
+
+def read_completion(cur, project_id):
+    """
+    Same shape as app.field_completion()[project_id], read from the
+    counters – O(fields), independent of how many posts the project has.
+    """
+    total_q, fields_q = completion_queries(project_id)
+    cur.execute(*total_q)
+    row = cur.fetchone()
+    cur.execute(*fields_q)
+    return completion_result(row, cur.fetchall())
+
+
+def completion_queries(project_id):
+    """(total, fields) – the two (sql, params) read_completion() runs."""
+    return (
+        ("SELECT post_count FROM ProjectStats WHERE project_id=%s", (project_id,)),
+        (
+            """
+            SELECT f.name, COALESCE(s.filled, 0) AS filled
+            FROM   ProjectField f
+            LEFT   JOIN ProjectFieldStats s ON s.field_id = f.id
+            WHERE  f.project_id = %s
+            """,
+            (project_id,),
+        ),
+    )
+
+
+def completion_result(total_row, field_rows):
+    total = total_row["post_count"] if total_row else 0
+    return {
+        "total_posts": total,
+        "fields": {
+            r["name"]: {
+                "filled": r["filled"],
+                "pct": round(r["filled"] / total * 100, 2) if total else 0.0,
+            }
+            for r in field_rows
+        },
+    }
+
+
+# ---------------------------------------------------------------
+#  Reconciliation
+# ---------------------------------------------------------------
+_TRUE_POSTS = """
+    SELECT p.id AS project_id, COUNT(pp.id) AS n
+    FROM   Project p
+    LEFT   JOIN ProjectPost pp ON pp.project_id = p.id
+    {where}
+    GROUP  BY p.id
+"""
+
+_TRUE_FILLS = """
+    SELECT f.id AS field_id, f.project_id, COUNT(ar.id) AS n
+    FROM   ProjectField f
+    LEFT   JOIN AnalysisResult ar ON ar.field_id = f.id
+    {where}
+    GROUP  BY f.id, f.project_id
+"""
+
+
+def rebuild(cur, project_id=None):
+    """Recompute counters from the base tables (all projects or one)."""
+    where, args = ("WHERE project_id = %s", (project_id,)) if project_id else ("", ())
+    cur.execute(f"DELETE FROM ProjectFieldStats {where}", args)
+    cur.execute(f"DELETE FROM ProjectStats {where}", args)
+
+    p_where = "WHERE p.id = %s" if project_id else ""
+    f_where = "WHERE f.project_id = %s" if project_id else ""
+    cur.execute(
+        "INSERT INTO ProjectStats (project_id, post_count) "
+        + _TRUE_POSTS.format(where=p_where),
+        args,
+    )
+    cur.execute(
+        "INSERT INTO ProjectFieldStats (field_id, project_id, filled) "
+        + _TRUE_FILLS.format(where=f_where),
+        args,
+    )
+
+
+def verify(cur):
+    """Return a list of counters that disagree with the base tables."""
+    bad = []
+    cur.execute(
+        f"""
+        SELECT t.project_id, t.n, COALESCE(s.post_count, 0) AS stored
+        FROM   ({_TRUE_POSTS.format(where="")}) t
+        LEFT   JOIN ProjectStats s ON s.project_id = t.project_id
+        WHERE  t.n <> COALESCE(s.post_count, 0)
+        """
+    )
+    bad += [
+        {"project_id": r["project_id"], "counter": "post_count",
+         "expected": r["n"], "stored": r["stored"]}
+        for r in cur.fetchall()
+    ]
+    cur.execute(
+        f"""
+        SELECT t.project_id, t.field_id, t.n, COALESCE(s.filled, 0) AS stored
+        FROM   ({_TRUE_FILLS.format(where="")}) t
+        LEFT   JOIN ProjectFieldStats s ON s.field_id = t.field_id
+        WHERE  t.n <> COALESCE(s.filled, 0)
+        """
+    )
+    bad += [
+        {"project_id": r["project_id"], "counter": f"field {r['field_id']} filled",
+         "expected": r["n"], "stored": r["stored"]}
+        for r in cur.fetchall()
+    ]
+    return bad
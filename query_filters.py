@@ -0,0 +1,241 @@
+# ================================================================
+#  query_filters.py  –  shared post‑filter compilation for the
+#                       search endpoints (search_post, combo_post_…)
+# ================================================================
+import weakref
+from datetime import datetime
+from functools import lru_cache
+
+
+class FilterError(ValueError):
+    """A filter parameter could not be parsed."""
+
+
+# Every filter the post‑search endpoints understand, in the one canonical
+# order used to build SQL.  Query‑string order therefore never changes the
+# generated text, so each combination ("shape") compiles exactly once.
+CLAUSES = {
+    "social_media":      "SocialMedia.name = %s",
+    "username":          "`User`.username = %s",
+    "first_name":        "`User`.first_name_norm = %s",
+    "first_name_prefix": "`User`.first_name_norm LIKE %s",
+    "last_name":         "`User`.last_name_norm = %s",
+    "last_name_prefix":  "`User`.last_name_norm LIKE %s",
+    "time":              "Post.post_time BETWEEN %s AND %s",
+    "content":           "MATCH(Post.content) AGAINST (%s IN BOOLEAN MODE)",
+}
+
+MATCH = CLAUSES["content"]
+# Relevance as an exact DECIMAL.  A relevance page cursor carries the
+# last score back and the keyset compares it with = and <, which a
+# DOUBLE round‑tripped through the client cannot do reliably.
+SCORE = f"CAST({MATCH} AS DECIMAL(20, 9))"
+
+
+# Request keys PostFilter reads (anything else in a query string is ignored)
+FILTER_KEYS = ("social_media", "username", "first_name", "last_name",
+               "from_time", "to_time", "content", "name_match")
+
+
+def like_prefix(s):
+    """Escape LIKE wildcards in *s* and append % for a prefix match."""
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class PostFilter:
+    """
+    Canonical form of the search filters in a request's query string:
+
+        social_media, username, first_name, last_name,
+        from_time + to_time (both, YYYY-MM-DD HH:MM:SS),
+        content (boolean‑mode full‑text), name_match=prefix
+    """
+
+    def __init__(self, args):
+        get = lambda k: (args.get(k) or "").strip()
+        prefix = get("name_match") == "prefix"
+        self.values = {}
+
+        if get("social_media"):
+            self.values["social_media"] = (get("social_media"),)
+        if get("username"):
+            self.values["username"] = (get("username"),)
+        for key in ("first_name", "last_name"):
+            name = get(key).lower()
+            if name and prefix:
+                self.values[key + "_prefix"] = (like_prefix(name),)
+            elif name:
+                self.values[key] = (name,)
+        if get("from_time") and get("to_time"):
+            try:
+                self.values["time"] = (
+                    datetime.strptime(get("from_time"), "%Y-%m-%d %H:%M:%S"),
+                    datetime.strptime(get("to_time"), "%Y-%m-%d %H:%M:%S"),
+                )
+            except ValueError:
+                raise FilterError("Invalid datetime format")
+        if get("content"):
+            self.values["content"] = (get("content"),)
+
+    @property
+    def shape(self):
+        return tuple(k for k in CLAUSES if k in self.values)
+
+    @property
+    def content(self):
+        return self.values.get("content", (None,))[0]
+
+    def where(self):
+        return compile_where(self.shape)
+
+    def params(self):
+        return [v for k in self.shape for v in self.values[k]]
+
+
+@lru_cache(maxsize=256)
+def compile_where(shape):
+    return "".join(" AND " + CLAUSES[k] for k in shape)
+
+
+# ---------------------------------------------------------------
+#  Statement templates – cached per (shape, variant) so the same str
+#  object is handed to the prepared cursor on every call.
+# ---------------------------------------------------------------
+@lru_cache(maxsize=256)
+def search_sql(shape, paged=False, after=False, by_score=False):
+    """
+    /search_post.  Parameters, in order: [content if "content" in shape]
+    + filter params + (paged: keyset params + limit).
+    """
+    where = compile_where(shape)
+    score = f", {SCORE} AS score" if "content" in shape else ""
+
+    if not paged:
+        return f"""
+            SELECT
+                Post.id,
+                Post.content AS text,
+                Post.post_time,
+                SocialMedia.name AS social_media,
+                `User`.username,
+                Project.name AS project_name
+                {score}
+            FROM Post
+            JOIN `User`            ON Post.user_id = `User`.id
+            JOIN SocialMedia       ON Post.social_media_id = SocialMedia.id
+            LEFT JOIN ProjectPost  ON Post.id = ProjectPost.post_id
+            LEFT JOIN Project      ON ProjectPost.project_id = Project.id
+            WHERE 1=1 {where}
+            ORDER BY {"score DESC" if by_score else "Post.post_time DESC"}
+        """
+
+    # Page over posts first, then attach projects, so a post linked to
+    # several projects is never split across two pages.
+    if by_score:
+        order = "score DESC, id DESC"
+        ks = f" AND ({SCORE} < %s OR ({SCORE} = %s AND Post.id < %s))" if after else ""
+    else:
+        order = "post_time DESC, id DESC"
+        ks = (" AND (Post.post_time < %s OR (Post.post_time = %s AND Post.id < %s))"
+              if after else "")
+    return f"""
+        SELECT p.*, Project.name AS project_name
+        FROM (
+            SELECT Post.id, Post.content AS text, Post.post_time,
+                   SocialMedia.name AS social_media, `User`.username
+                   {score}
+            FROM Post
+            JOIN `User`       ON Post.user_id = `User`.id
+            JOIN SocialMedia  ON Post.social_media_id = SocialMedia.id
+            WHERE 1=1 {where} {ks}
+            ORDER BY {order}
+            LIMIT %s
+        ) p
+        LEFT JOIN ProjectPost  ON p.id = ProjectPost.post_id
+        LEFT JOIN Project      ON ProjectPost.project_id = Project.id
+        ORDER BY {", ".join("p." + o for o in order.split(", "))}
+    """
+
+
+@lru_cache(maxsize=256)
+def combo_posts_sql(shape):
+    """/combo_post_to_experiment step 1 – matching posts."""
+    return f"""
+        SELECT
+            Post.id,
+            Post.content AS text,
+            Post.post_time,
+            SocialMedia.name AS social_media,
+            `User`.username
+        FROM Post
+        JOIN `User`            ON Post.user_id = `User`.id
+        JOIN SocialMedia       ON Post.social_media_id = SocialMedia.id
+        WHERE 1=1 {compile_where(shape)}
+        ORDER BY Post.post_time DESC
+    """
+
+
+@lru_cache(maxsize=256)
+def combo_stream_sql(shape):
+    """
+    /combo_post_to_experiment streaming – posts joined to their projects
+    and results, rows grouped by ProjectPost.id.
+    """
+    return f"""
+        SELECT
+            Post.id, Post.content AS text, Post.post_time,
+            SocialMedia.name AS social_media, `User`.username,
+            Project.name AS project_name, ProjectPost.id AS project_post_id,
+            ProjectField.name AS field_name, AnalysisResult.value
+        FROM Post
+        JOIN `User`       ON Post.user_id = `User`.id
+        JOIN SocialMedia  ON Post.social_media_id = SocialMedia.id
+        JOIN ProjectPost  ON Post.id = ProjectPost.post_id
+        JOIN Project      ON ProjectPost.project_id = Project.id
+        LEFT JOIN AnalysisResult ON ProjectPost.id = AnalysisResult.project_post_id
+        LEFT JOIN ProjectField   ON AnalysisResult.field_id = ProjectField.id
+        WHERE 1=1 {compile_where(shape)}
+        ORDER BY Post.post_time DESC, ProjectPost.id
+    """
+
+
+@lru_cache(maxsize=256)
+def assign_sql(shape, ranged=False):
+    """
+    /assign_posts_by_filter – link every matching post to a project in
+    MySQL.  Parameters: project_id + filter params (+ id_lo, id_hi).
+    """
+    return f"""
+        INSERT IGNORE INTO ProjectPost (project_id, post_id)
+        SELECT %s, Post.id
+        FROM Post
+        JOIN `User`       ON Post.user_id = `User`.id
+        JOIN SocialMedia  ON Post.social_media_id = SocialMedia.id
+        WHERE 1=1 {compile_where(shape)}
+        {"AND Post.id BETWEEN %s AND %s" if ranged else ""}
+    """
+
+
+# ---------------------------------------------------------------
+#  Server‑side prepared statements
+# ---------------------------------------------------------------
+# mysql.connector re‑prepares whenever a prepared cursor is handed a
+# different str object, so one cursor is kept per (connection, SQL text).
+# Pooled connections live long, hence MySQL parses each shape once per
+# connection.  Entries vanish with their connection.
+PREPARED_PER_CONN = 64
+_prepared = weakref.WeakKeyDictionary()
+
+
+def fetch_prepared(conn, sql, params):
+    """Execute *sql* as a prepared statement on *conn*; return dict rows."""
+    cursors = _prepared.setdefault(conn, {})
+    cur = cursors.pop(sql, None)
+    if cur is None:
+        if len(cursors) >= PREPARED_PER_CONN:
+            oldest = next(iter(cursors))
+            cursors.pop(oldest).close()
+        cur = conn.cursor(prepared=True, dictionary=True)
+    cursors[sql] = cur                       # most recently used last
+    cur.execute(sql, tuple(params))
+    return cur.fetchall()
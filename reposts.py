@@ -0,0 +1,312 @@
+# ================================================================
+#  reposts.py  –  repost cascade queries (used by /repost_cascade,
+#                 /repost_cascade_metrics and /top_reposted)
+#
+#  Repost(original_post_id → repost_post_id) edges form a tree per
+#  root post: a repost can itself be reposted.  The tree is walked in
+#  MySQL with a recursive CTE over the UNIQUE(original_post_id, …)
+#  index, one level per iteration, so a 100k‑node cascade is one query.
+#  Post.is_repost / repost_count / root_post_id are kept in step by
+#  /repost; backfill() recomputes them from Repost.
+# ================================================================
+MAX_DEPTH = 500         # hard cap on levels walked (cte_max_recursion_depth)
+TREE_MAX_DEPTH = 100    # deeper cascades are returned as a flat edge list –
+                        # JSON encoders recurse once per nesting level
+
+_CASCADE = """
+    WITH RECURSIVE cascade (parent_id, post_id, reposter_id, repost_time, depth) AS (
+        SELECT original_post_id, repost_post_id, reposter_id, repost_time, 1
+        FROM   Repost
+        WHERE  original_post_id = %s
+        UNION ALL
+        SELECT r.original_post_id, r.repost_post_id, r.reposter_id, r.repost_time,
+               c.depth + 1
+        FROM   Repost r
+        JOIN   cascade c ON r.original_post_id = c.post_id
+        WHERE  c.depth < %s
+    )
+"""
+
+
+ROOT_SQL = """
+    SELECT p.id, p.content, p.post_time, u.username, sm.name AS social_media
+    FROM   Post p
+    JOIN   `User` u      ON u.id  = p.user_id
+    JOIN   SocialMedia sm ON sm.id = p.social_media_id
+    WHERE  p.id = %s
+"""
+
+
+def root_post(cur, post_id):
+    cur.execute(ROOT_SQL, (post_id,))
+    return cur.fetchone()
+
+
+def cascade_query(post_id, max_depth=MAX_DEPTH):
+    """(sql, params) for every edge under *post_id*, level by level."""
+    return (
+        _CASCADE + """
+        SELECT c.parent_id, c.post_id, c.repost_time, c.depth, u.username
+        FROM   cascade c
+        JOIN   `User` u ON u.id = c.reposter_id
+        ORDER  BY c.depth, c.repost_time, c.post_id
+        """,
+        (post_id, max_depth),
+    )
+
+
+def cascade_metrics(cur, root, max_depth=MAX_DEPTH):
+    """Size / depth / breadth / velocity of *root*'s cascade, aggregated in SQL."""
+    cur.execute(*cascade_metrics_query(root["id"], max_depth))
+    return metrics_from_row(root, cur.fetchone())
+
+
+def cascade_metrics_query(post_id, max_depth=MAX_DEPTH):
+    return (
+        _CASCADE + """
+        SELECT COUNT(*) AS size, COALESCE(MAX(depth), 0) AS depth,
+               MIN(repost_time) AS first_repost, MAX(repost_time) AS last_repost,
+               (SELECT COUNT(*) FROM cascade GROUP BY depth
+                ORDER BY COUNT(*) DESC LIMIT 1) AS max_breadth
+        FROM   cascade
+        """,
+        (post_id, max_depth),
+    )
+
+
+def metrics_from_row(root, row):
+    return metrics(root["post_time"], row["size"], row["depth"],
+                   row["max_breadth"] or 0, row["first_repost"], row["last_repost"])
+
+
+def metrics(root_time, size, depth, max_breadth, first, last):
+    span = (last - root_time).total_seconds() if last else 0
+    return {
+        "size": size,
+        "depth": depth,
+        "max_breadth": max_breadth,
+        "first_repost_after_s": (first - root_time).total_seconds() if first else None,
+        "last_repost_after_s": span if last else None,
+        "reposts_per_hour": round(size / (span / 3600), 2) if span > 0 else None,
+    }
+
+
+def edge_row(edge):
+    return {**edge, "repost_time": edge["repost_time"].strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def build_tree(root, edges):
+    """
+    Nest *edges* (ordered by depth, as cascade_query returns them) under
+    *root*.  Parents always precede their children, so one pass with an
+    id → node map suffices.  Returns (tree, metrics).
+    """
+    tree = {"post_id": root["id"], "username": root["username"], "reposts": []}
+    nodes = {root["id"]: tree}
+    per_level = {}
+    first = last = None
+    depth = 0
+    for e in edges:
+        node = {
+            "post_id": e["post_id"],
+            "username": e["username"],
+            "repost_time": e["repost_time"].strftime("%Y-%m-%d %H:%M:%S"),
+            "reposts": [],
+        }
+        nodes[e["post_id"]] = node
+        parent = nodes.get(e["parent_id"])
+        if parent is not None:
+            parent["reposts"].append(node)
+        per_level[e["depth"]] = per_level.get(e["depth"], 0) + 1
+        depth = max(depth, e["depth"])
+        first = e["repost_time"] if first is None else min(first, e["repost_time"])
+        last = e["repost_time"] if last is None else max(last, e["repost_time"])
+
+    return tree, metrics(root["post_time"], len(nodes) - 1, depth,
+                         max(per_level.values(), default=0), first, last)
+
+
+def top_reposted_query(lo, hi, limit, platform=None, window="repost"):
+    """
+    window="repost": posts with the most reposts made in [lo, hi) –
+    served by idx_repost_time, grouped before joining the post details.
+    window="post": originals posted in [lo, hi) ranked by their
+    all‑time Post.repost_count – no Repost access at all.
+    """
+    if window == "post":
+        return (
+            f"""
+            SELECT p.id, p.content, p.post_time, u.username,
+                   sm.name AS social_media, p.repost_count AS reposts
+            FROM   Post p
+            JOIN   `User` u       ON u.id  = p.user_id
+            JOIN   SocialMedia sm ON sm.id = p.social_media_id
+            WHERE  p.post_time >= %s AND p.post_time < %s
+              AND  p.is_repost = FALSE AND p.repost_count > 0
+              {"AND sm.name = %s" if platform else ""}
+            ORDER  BY p.repost_count DESC, p.id
+            LIMIT  %s
+            """,
+            (lo, hi, *((platform,) if platform else ()), limit),
+        )
+    return (
+        f"""
+        SELECT p.id, p.content, p.post_time, u.username,
+               sm.name AS social_media, t.reposts
+        FROM (
+            SELECT original_post_id, COUNT(*) AS reposts
+            FROM   Repost
+            WHERE  repost_time >= %s AND repost_time < %s
+            GROUP  BY original_post_id
+        ) t
+        JOIN Post p          ON p.id  = t.original_post_id
+        JOIN `User` u        ON u.id  = p.user_id
+        JOIN SocialMedia sm  ON sm.id = p.social_media_id
+        {"WHERE sm.name = %s" if platform else ""}
+        ORDER BY t.reposts DESC, p.id
+        LIMIT %s
+        """,
+        (lo, hi, *((platform,) if platform else ()), limit),
+    )
+
+
+# ---------------------------------------------------------------
+#  Denormalised Post.is_repost / repost_count / root_post_id
+# ---------------------------------------------------------------
+def backfill(cur):
+    """
+    Recompute the repost columns of every post from Repost
+    (`manage.py backfill-reposts`).  Returns rows changed per column.
+    """
+    changed = {}
+    cur.execute(
+        """
+        UPDATE Post p
+        LEFT JOIN (SELECT DISTINCT repost_post_id FROM Repost) r
+               ON r.repost_post_id = p.id
+        SET    p.is_repost = (r.repost_post_id IS NOT NULL)
+        """
+    )
+    changed["is_repost"] = cur.rowcount
+    cur.execute(
+        """
+        UPDATE Post p
+        LEFT JOIN (SELECT original_post_id, COUNT(*) AS n
+                   FROM Repost GROUP BY original_post_id) t
+               ON t.original_post_id = p.id
+        SET    p.repost_count = COALESCE(t.n, 0)
+        """
+    )
+    changed["repost_count"] = cur.rowcount
+    # roots are originals that are not reposts themselves; walk down
+    # from each and stamp every repost with its root
+    cur.execute(
+        """
+        WITH RECURSIVE chain (post_id, root_id) AS (
+            SELECT r.repost_post_id, r.original_post_id
+            FROM   Repost r
+            WHERE  NOT EXISTS (SELECT 1 FROM Repost x
+                               WHERE x.repost_post_id = r.original_post_id)
+            UNION ALL
+            SELECT r.repost_post_id, c.root_id
+            FROM   Repost r
+            JOIN   chain c ON r.original_post_id = c.post_id
+        )
+        UPDATE Post p
+        LEFT JOIN chain c ON c.post_id = p.id
+        SET    p.root_post_id = c.root_id
+        """
+    )
+    changed["root_post_id"] = cur.rowcount
+    return changed
+
+
+# ---------------------------------------------------------------
+#  Recording reposts (/repost and /repost_batch)
+# ---------------------------------------------------------------
+def lock_originals(cur, post_ids):
+    """
+    Lock the original posts (ascending id, so concurrent batches never
+    deadlock on each other) and return {id: row}.  Their repost_count is
+    bumped later in the same transaction.
+    """
+    ids = sorted(set(post_ids))
+    if not ids:
+        return {}
+    cur.execute(
+        f"""
+        SELECT id, social_media_id, post_time, content, root_post_id
+        FROM   Post
+        WHERE  id IN ({",".join(["%s"] * len(ids))})
+        ORDER  BY id
+        FOR UPDATE
+        """,
+        tuple(ids),
+    )
+    return {r["id"]: r for r in cur.fetchall()}
+
+
+def existing_posts(cur, keys):
+    """Subset of (user_id, media_id, post_time) keys already taken in Post."""
+    if not keys:
+        return set()
+    cur.execute(
+        f"""
+        SELECT user_id, social_media_id, post_time FROM Post
+        WHERE  (user_id, social_media_id, post_time) IN
+               ({",".join(["(%s,%s,%s)"] * len(keys))})
+        """,
+        tuple(v for k in keys for v in k),
+    )
+    return {(r["user_id"], r["social_media_id"], r["post_time"]) for r in cur.fetchall()}
+
+
+def insert_reposts(cur, rows):
+    """
+    *rows*: (original_row, reposter_id, repost_time) with the originals
+    locked by lock_originals().  Creates the repost Post rows, their
+    Repost links and bumps each original's repost_count – three
+    statements (plus a read‑back of the new ids for more than one row).
+    """
+    cur.execute(
+        """
+        INSERT INTO Post (user_id, social_media_id, post_time, content,
+                          is_repost, root_post_id)
+        VALUES """ + ",".join(["(%s,%s,%s,%s,TRUE,%s)"] * len(rows)),
+        tuple(v for orig, uid, t in rows
+              for v in (uid, orig["social_media_id"], t, orig["content"],
+                        orig["root_post_id"] or orig["id"])),
+    )
+    if len(rows) == 1:
+        new_ids = [cur.lastrowid]
+    else:
+        keys = [(uid, orig["social_media_id"], t) for orig, uid, t in rows]
+        cur.execute(
+            f"""
+            SELECT id, user_id, social_media_id, post_time FROM Post
+            WHERE  (user_id, social_media_id, post_time) IN
+                   ({",".join(["(%s,%s,%s)"] * len(keys))})
+            """,
+            tuple(v for k in keys for v in k),
+        )
+        by_key = {(r["user_id"], r["social_media_id"], r["post_time"]): r["id"]
+                  for r in cur.fetchall()}
+        new_ids = [by_key[k] for k in keys]
+
+    cur.execute(
+        "INSERT INTO Repost (original_post_id, repost_post_id, reposter_id, repost_time) "
+        "VALUES " + ",".join(["(%s,%s,%s,%s)"] * len(rows)),
+        tuple(v for (orig, uid, t), new_id in zip(rows, new_ids)
+              for v in (orig["id"], new_id, uid, t)),
+    )
+
+    counts = {}
+    for orig, _, _ in rows:
+        counts[orig["id"]] = counts.get(orig["id"], 0) + 1
+    cur.execute(
+        "UPDATE Post SET repost_count = repost_count + CASE id "
+        + "WHEN %s THEN %s " * len(counts)
+        + f"END WHERE id IN ({','.join(['%s'] * len(counts))})",
+        (*(v for item in counts.items() for v in item), *counts),
+    )
+    return new_ids
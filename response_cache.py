@@ -0,0 +1,168 @@
+# ================================================================
+#  response_cache.py  –  read‑through cache for GET endpoints
+#
+#  Entries are keyed by endpoint + query args + the current version of
+#  every tag the endpoint depends on ("projects", "project:7", …).  The
+#  *versions* callable supplies them (app.py: the DataVersion counters,
+#  see data_version.py), so a write made by any worker or by manage.py
+#  bumps them and stale entries are simply never looked up again; they
+#  age out through LRU/TTL.  The cache itself never invalidates.  A
+#  *variant* callable adds the negotiated representation to the key.
+# ================================================================
+import threading, time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request
+
+
+def request_key(endpoint, arg_items, deps, versions, variant=""):
+    """
+    Unambiguous key for a request's args, tag versions and *variant*
+    (the negotiated representation); also the ETag input.
+    """
+    args = urlencode(sorted(arg_items))
+    ver = urlencode(list(zip(deps, versions)))
+    return f"{endpoint}?{args}#{ver};{variant}"
+
+
+class MemoryBackend:
+    """In‑process LRU with a TTL and entry/byte bounds (per worker)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self._data = OrderedDict()          # key -> (expires_at, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires_at, value = hit
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def _drop(self, key):
+        _, value = self._data.pop(key)
+        self._bytes -= len(value)
+
+    def size(self):
+        return {"entries": len(self._data), "bytes": self._bytes}
+
+
+class RedisBackend:
+    """Redis‑compatible entry store – shared by every worker on the host."""
+
+    name = "redis"
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="rc:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("cache backend 'redis' needs `pip install redis`")
+        self.r = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.r.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.r.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def size(self):
+        return {}
+
+
+class ResponseCache:
+    """
+    *versions*: callable(tags) -> [version per tag], the only source of
+    tag versions.  *variant*: optional callable() -> representation name.
+    """
+
+    def __init__(self, backend, ttl, enabled, versions, variant=None):
+        self.backend = backend
+        self.versions = versions
+        self.variant = variant or (lambda: "")
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def from_config(cls, cfg, versions, variant=None):
+        cfg = dict(cfg)
+        kind = cfg.pop("backend", "memory")
+        ttl = cfg.pop("ttl", 60)
+        enabled = cfg.pop("enabled", True)
+        if kind == "redis":
+            backend = RedisBackend(cfg.get("redis_url", "redis://localhost:6379/0"))
+        else:
+            backend = MemoryBackend(cfg.get("max_entries", 1024),
+                                    cfg.get("max_bytes", 64 * 1024 * 1024))
+        return cls(backend, ttl, enabled, versions, variant)
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def cached(self, tags):
+        """
+        Decorator for a GET view.  *tags* is a list of tag names or a
+        callable(request.args) returning one.  Only 200 responses are kept.
+        """
+        def deco(view):
+            @wraps(view)
+            def wrapper(*a, **kw):
+                if not self.enabled:
+                    return view(*a, **kw)
+                deps = tags(request.args) if callable(tags) else list(tags)
+                versions = self.versions(deps)
+                key = request_key(request.endpoint, request.args.items(multi=True),
+                                  deps, versions, self.variant())
+
+                stored = self.backend.get(key)
+                if stored is not None:
+                    self._count("hits")
+                    mimetype, _, body = stored.partition(b"\n")
+                    return current_app.response_class(body, mimetype=mimetype.decode())
+                self._count("misses")
+
+                resp = view(*a, **kw)
+                r = current_app.make_response(resp)
+                if r.status_code == 200 and not r.is_streamed:
+                    self.backend.set(key, r.mimetype.encode() + b"\n" + r.get_data(), self.ttl)
+                return r
+            return wrapper
+        return deco
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            **self.backend.size(),
+        }
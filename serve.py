@@ -0,0 +1,98 @@
+# ================================================================
+#  serve.py  –  production launcher: pre‑forked gunicorn workers
+#
+#    python serve.py [--bind 0.0.0.0:5001] [--workers N] [--threads 4]
+#                    [--request-timeout 30] [--timeout 60] [--graceful-timeout 30]
+#
+#  The app is imported once in the master and forked into N workers
+#  (default: CPU count).  Each worker drops the connections it inherited
+#  and opens its own pool.  Signals to the master:
+#    HUP   graceful reload – new workers start, old ones finish in‑flight
+#          requests (up to --graceful-timeout) and exit.  Code is loaded
+#          once in the master, so deploy new code with USR2 (start a new
+#          master) followed by TERM to the old one.
+#    TERM  graceful shutdown,  TTIN / TTOU  add / remove a worker
+#  gthread workers never kill a slow request, so --request-timeout is
+#  enforced by MySQL instead: each pooled connection gets that
+#  max_execution_time, and a SELECT running longer is aborted (streams
+#  and background jobs are exempt, see app.db_cursor).
+#  `python app.py` remains the single‑process debug server.
+#
+#  Needs:  pip install gunicorn
+# ================================================================
+import argparse, os, sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    sys.exit("serve.py needs `pip install gunicorn`")
+
+REQUEST_TIMEOUT = None      # set by main(), applied in each worker
+
+
+def post_fork(server, worker):
+    import app
+    app.POOL.reset_after_fork()
+    app.POOL.statement_timeout = REQUEST_TIMEOUT or None
+    app.JOBS.reset_after_fork()
+    server.log.info("worker %s: connection pool and job queue reset", worker.pid)
+
+
+def worker_exit(server, worker):
+    import app
+    app.POOL.dispose()
+
+
+class Server(BaseApplication):
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        return app
+
+
+def main(argv=None):
+    global REQUEST_TIMEOUT
+    p = argparse.ArgumentParser(description="Run the analysis API with gunicorn")
+    p.add_argument("--bind", default="127.0.0.1:5001")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="worker processes (default: CPU count)")
+    p.add_argument("--threads", type=int, default=4,
+                   help="request threads per worker (keep <= pool size + overflow)")
+    p.add_argument("--request-timeout", type=float, default=30,
+                   help="abort a request's SELECT after this long (s, 0 = no limit)")
+    p.add_argument("--timeout", type=int, default=60,
+                   help="restart a worker that stops heartbeating this long (s); "
+                        "does not bound single requests")
+    p.add_argument("--graceful-timeout", type=int, default=30,
+                   help="time allowed to finish requests on reload/shutdown (s)")
+    p.add_argument("--max-requests", type=int, default=0,
+                   help="recycle a worker after this many requests (0 = never)")
+    args = p.parse_args(argv)
+    REQUEST_TIMEOUT = args.request_timeout
+
+    Server({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": 5,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "preload_app": True,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()